@@ -1,120 +1,705 @@
 import os
+import asyncio
+import contextlib
+import datetime
+import logging
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cachetools import TTLCache
 import google.generativeai as genai
-from typing import Optional, Dict, Any, List
+from google.generativeai import caching
+from google.api_core import exceptions as google_exceptions
+from typing import Optional, Dict, Any, List, Tuple, Iterator, AsyncIterator
 import time
+import numpy as np
 import pandas as pd
 
 # Načtení API klíče z Replit Secrets
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
+# Logger modulu - na rozdíl od print() neblokuje stdout při souběžných voláních
+logger = logging.getLogger(__name__)
+
+# Systémová instrukce pro chat - předává se modelu jako system_instruction,
+# takže se neposílá (a netokenizuje) znovu s každou zprávou
+SYSTEM_PROMPT = ("Odpověz v Českém jazyce. Jsi finanční asistent, který pomáhá "
+                 "s analýzou finančních trhů a komodit. Zaměřuješ se na analýzu "
+                 "zlata (GOLD, XAU/USD), měnových párů a dalších finančních "
+                 "instrumentů.")
+
 # Nastavení pro řízení četnosti požadavků a opakování při chybách
 MAX_RETRIES = 3
-RETRY_DELAY = 2  # sekundy mezi pokusy
+RETRY_DELAY = 2  # základ pro exponenciální backoff (sekundy)
+MAX_RETRY_DELAY = 30  # strop čekání mezi pokusy (sekundy)
+
+# Chyby, po kterých nemá smysl opakovat (autentizace/validace)
+_FATAL_ERRORS = (google_exceptions.PermissionDenied,
+                 google_exceptions.Unauthenticated,
+                 google_exceptions.InvalidArgument)
+# Maximální doba čekání na jedno volání Gemini API (sekundy).
+# Omezuje vzácné, extrémně pomalé odpovědi - po vypršení se uplatní retry,
+# který bývá rychlejší než čekání na pomalý požadavek.
+REQUEST_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "15"))
+
+# Krátkodobá cache hotových analýz - opakované kliknutí/polling pro stejný
+# symbol se stejnými daty se vrátí z paměti místo dalšího volání Gemini
+_ANALYSIS_CACHE = TTLCache(maxsize=256, ttl=300)
+_ANALYSIS_CACHE_LOCK = threading.RLock()
+
+# Sdílený pool vláken pro souběžné odbavení více analýz z běžného
+# (synchronního) kódu - vlákna se nevytvářejí při každém požadavku
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini")
+
+# Limit požadavků za minutu - klouzavé okno časových razítek posledních volání
+RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "60"))
+_CALL_WINDOW: deque = deque()
+_CALL_WINDOW_LOCK = threading.Lock()
+
+class _AdaptiveLimiter:
+    """
+    AIMD řízení souběžnosti volání Gemini API.
+
+    Po úspěšném volání povolená souběžnost pozvolna roste (aditivně),
+    po chybě se skokově půlí - stejný princip, jakým TCP hledá propustnost.
+    Brání tomu, aby nárazová zátěž rozpoutala lavinu 429 odpovědí.
+    """
+
+    def __init__(self, start: float = 4, maximum: float = 8):
+        self._limit = float(start)
+        self._maximum = float(maximum)
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= int(self._limit):
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, success: bool) -> None:
+        with self._cond:
+            self._active -= 1
+            if success:
+                self._limit = min(self._maximum, self._limit + 0.5)
+            else:
+                self._limit = max(1.0, self._limit / 2)
+            self._cond.notify_all()
+
+_LIMITER = _AdaptiveLimiter()
+
+def _acquire_rate_slot() -> None:
+    """Zablokuje volající vlákno, dokud se v klouzavém 60s okně neuvolní
+    místo pod RPM_LIMIT."""
+    while True:
+        with _CALL_WINDOW_LOCK:
+            now = time.monotonic()
+            while _CALL_WINDOW and _CALL_WINDOW[0] <= now - 60:
+                _CALL_WINDOW.popleft()
+            if len(_CALL_WINDOW) < RPM_LIMIT:
+                _CALL_WINDOW.append(now)
+                return
+            wait = _CALL_WINDOW[0] + 60 - now
+        time.sleep(wait)
+
+@contextlib.contextmanager
+def _gemini_call_slot():
+    """Počká na místo v RPM okně i na AIMD limiteru a po dokončení volání
+    podle výsledku upraví povolenou souběžnost."""
+    _acquire_rate_slot()
+    _LIMITER.acquire()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        _LIMITER.release(success)
+
+# Mapování známých symbolů na typ instrumentu pro text analýzy;
+# symboly mimo mapu se rozliší podle lomítka (měnový pár vs. komodita)
+_INSTRUMENT_MAP = {
+    "I:XAUUSD": "zlato", "GOLD": "zlato", "XAU/USD": "zlato",
+    "I:XAGUSD": "stříbro", "SILVER": "stříbro", "XAG/USD": "stříbro",
+    "AAPL": "akcie", "MSFT": "akcie", "GOOG": "akcie", "AMZN": "akcie",
+}
+
+# Statické instrukce pro multi-timeframe analýzu. Jsou neměnné, proto se
+# posílají jako system_instruction analytického modelu místo opakování
+# v každém uživatelském promptu - šetří to vstupní tokeny každého volání.
+_ANALYSIS_INSTRUCTIONS = """
+    Proveď MULTI-TIMEFRAME ANALÝZU pomocí pokročilých obchodních konceptů a poskytni následující:
+
+    1. Shrnutí aktuální situace na trhu:
+       - Analýza hlavního trendu na denním (D1) timeframe
+       - Identifikace klíčových HTF (Higher Time Frame) úrovní a struktury trhu
+       - Určení hlavních supply/demand zón a order bloků (OB) z D1 a H4 timeframu
+
+    2. SMC/ICT analýza na H1 (hodinovém) timeframe:
+       - Identifikace FVG (Fair Value Gap), BOS (Break of Structure), CHOCH (Change of Character)
+       - Liquidity sweep/grab (PWH - Previous Week High, PWL - Previous Week Low)
+       - Imbalance (IMB) a mitigation
+       - ICT koncepty - OTE (Optimal Trade Entry), BPR (Buy-side/Sell-side Premium Zones)
+
+    3. KONKRÉTNÍ OBCHODNÍ SIGNÁLY PRO 5M TIMEFRAME:
+       - Doporučení pro NÁKUP nebo PRODEJ (případně VYČKÁNÍ)
+       - PŘESNÁ vstupní cena založená na:
+          * SMC/ICT konceptech (POI - Point of Interest, IFC - Institutional Flow Concepts)
+          * Order block (OB) nebo Fair Value Gap (FVG)
+          * IPA (Institutional Price Action) a BOS/FBOS (Break/Fake Break of Structure)
+          * SOW/SOS (Sign of Weakness/Strength)
+
+       - PŘESNÁ cena pro stoploss (na základě SMC/ICT konceptů):
+          * SL MUSÍ být umístěn za úrovněmi likvidity (LQD)
+          * SL MUSÍ být za BSL/SSL (Buy/Sell Side Liquidity) nebo order blokem
+          * SL MUSÍ být minimálně 2 body od vstupní ceny
+          * SL MUSÍ respektovat D2S/S2D (Demand to Supply, Supply to Demand) logiku
+
+       - PŘESNÉ cíle zisku založené na SMC/ICT:
+          * TP1: krátkodobý cíl (založený na nejbližším FVG/IMB) - minimálně 40 pipů (4 body) od vstupní ceny
+          * TP2: střednědobý cíl (založený na EQH/EQL - Equal High/Low nebo HTF FVG)
+          * TP3: dlouhodobý cíl (založený na main HTF supply/demand zónách, OB, FVG, IMB)
+
+       - Výpočet poměru rizika k zisku (Risk:Reward ratio) - VŽDY DOPORUČUJ POUZE OBCHODY S POMĚREM RIZIKA K ZISKU MINIMÁLNĚ 1:2,5
+
+    4. SMC/ICT rizikové faktory a poznámky:
+       - Manipulace likvidity (liquidity engineering)
+       - Stop hunts a smart money flow
+       - Doporučení pro částečné uzavírání pozice na jednotlivých TP úrovních
+       - Respektování TL (Trendline) a SnR (Support/Resistance)
+
+    Formátuj výstup pomocí markdown a používej vhodné nadpisy a odrážky pro přehlednost.
+    Odpověz v češtině. Buď konkrétní a přesný, zejména v číslech pro vstup, stoploss a take profit.
+
+    DŮLEŽITÉ PARAMETRY & VYSVĚTLENÍ ZKRATEK:
+    - SMC = Smart Money Concept
+    - ICT = Inner Circle Trader metodologie
+    - OB = Order Block (oblasti, kde instituce vstupují do trhu)
+    - FVG = Fair Value Gap (mezera v ceně, která bude pravděpodobně vyplněna)
+    - IMB = Imbalance (nerovnováha v order flow)
+    - BOS/FBOS = Break/Fake Break of Structure (průlom/falešný průlom struktury)
+    - CHOCH = Change of Character (změna charakteru ceny, často následuje po akumulaci)
+    - HTF/LTF = Higher/Lower Time Frame (vyšší/nižší časový rámec)
+    - EQH/EQL = Equal High/Low (stejné vrcholy/dna - cílové oblasti)
+    - POI = Point of Interest (oblast zájmu pro vstup)
+    - SnR = Support/Resistance (podpora/odpor)
+    - D2S/S2D = Demand to Supply, Supply to Demand (oblasti přechodu z poptávky do nabídky a naopak)
+    - BSL/SSL = Buy Side Liquidity / Sell Side Liquidity (likvidita pro nákupy/prodeje)
+    - TL = Trendline (trendová linie)
+    - PWH/PWL = Previous Week High/Low (high/low předchozího týdne)
+    - SOW/SOS = Sign of Weakness/Strength (známka slabosti/síly)
+    - LQD = Liquidity (likvidita - oblasti stop lossů)
+
+    - Předpokládej max. trvání obchodu 3 hodiny
+    - Pokud aktuální situace neumožňuje vhodný ICT/SMC setup, doporuč VYČKÁNÍ
+    """
+
+# Příznak jednorázové inicializace - genai.configure stačí zavolat jednou
+# za život procesu, opakované volání jen zbytečně přestavuje klienta SDK
+_gemini_initialized = False
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """
+    Vrátí dobu čekání před dalším pokusem.
+
+    Používá exponenciální backoff s jitterem; pokud server u rate-limitu
+    (429) doporučil vlastní retry_delay, respektuje ho.
+    """
+    server_delay = getattr(getattr(error, "retry_delay", None), "seconds", None)
+    if server_delay:
+        return float(server_delay) + random.uniform(0, 0.5)
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** attempt) + random.uniform(0, 0.5)
 
 def initialize_gemini():
     """
-    Inicializuje Gemini API s API klíčem.
-    
+    Inicializuje Gemini API s API klíčem. Skutečná konfigurace proběhne
+    jen při prvním volání, další volání vrací zapamatovaný výsledek.
+
     Returns:
         bool: True pokud inicializace proběhla úspěšně, jinak False
     """
+    global _gemini_initialized
+
+    if _gemini_initialized:
+        return True
+
     if not GEMINI_API_KEY:
         return False
-        
+
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
+        # Explicitně gRPC transport - drží perzistentní HTTP/2 spojení po
+        # celou dobu běhu procesu, takže opakovaná volání neplatí znovu
+        # TCP+TLS handshake
+        genai.configure(api_key=GEMINI_API_KEY, transport="grpc")
+        _gemini_initialized = True
         return True
     except Exception as e:
-        print(f"Chyba při inicializaci Gemini API: {e}")
+        logger.error("Chyba při inicializaci Gemini API: %s", e)
         return False
 
-def check_gemini_api_key() -> bool:
+# Zapamatovaný výsledek ověření API klíče - síťová kontrola se dělá jen
+# jednou za život procesu, pokud si volající nevyžádá čerstvou kontrolu
+_api_key_ok: Optional[bool] = None
+
+def check_gemini_api_key(force: bool = False) -> bool:
     """
     Kontroluje, zda je k dispozici API klíč pro Gemini a zda je funkční.
-    
+
+    Výsledek síťového ověření se pamatuje; opakovaná volání tak nestojí
+    žádný HTTP round-trip. S force=True se kontrola provede znovu.
+
+    Args:
+        force: Vynutí nové ověření proti API místo zapamatovaného výsledku
+
     Returns:
         True, pokud je klíč k dispozici a funkční, jinak False
     """
-    if not GEMINI_API_KEY:
+    global _api_key_ok
+
+    if not initialize_gemini():
         return False
-        
+
+    if _api_key_ok is not None and not force:
+        return _api_key_ok
+
     try:
-        # Zkusíme volat jednoduchou operaci s API, abychom ověřili, že klíč funguje
-        genai.configure(api_key=GEMINI_API_KEY)
-        models = genai.list_models()
-        # Pokud se dostaneme sem, API klíč funguje
-        return True
+        # Jediná lehká operace s API ověří, že klíč skutečně funguje -
+        # list_models vrací generátor, síťové volání vynutí až next()
+        next(iter(genai.list_models()), None)
+        _api_key_ok = True
     except Exception as e:
-        print(f"Chyba při kontrole Gemini API klíče: {e}")
-        return False
+        logger.error("Chyba při kontrole Gemini API klíče: %s", e)
+        _api_key_ok = False
+    return _api_key_ok
 
 def get_available_models() -> List[Dict[str, Any]]:
     """
     Získá seznam dostupných Gemini modelů.
-    
+
     Returns:
         Seznam dostupných modelů nebo prázdný seznam v případě chyby
     """
     if not initialize_gemini():
         return []
-        
+
     try:
         models = genai.list_models()
         # Filtrujeme pouze Gemini modely
         gemini_models = [
-            {"name": model.name, "display_name": model.display_name, 
+            {"name": model.name, "display_name": model.display_name,
              "description": model.description}
             for model in models if "gemini" in model.name.lower()
         ]
         return gemini_models
     except Exception as e:
-        print(f"Chyba při získávání dostupných modelů: {e}")
+        logger.error("Chyba při získávání dostupných modelů: %s", e)
         return []
 
+# Modely pro analýzy podle názvu + čas, kdy je třeba obnovit serverovou
+# context cache (monotonic). U fallbacku bez cache se model drží navždy.
+_ANALYSIS_MODELS: Dict[str, Tuple[float, genai.GenerativeModel]] = {}
+_ANALYSIS_MODELS_LOCK = threading.Lock()
+
+# Serverová cache instrukcí platí hodinu; obnovujeme ji chvíli předem
+_CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+_CONTEXT_CACHE_REFRESH = 55 * 60  # sekundy
+
+def _get_model(model_name: str) -> genai.GenerativeModel:
+    """
+    Vrátí analytický model se statickými instrukcemi.
+
+    Pokud účet a model podporují server-side context caching, instrukce se
+    nahrají jednou přes caching.CachedContent a Gemini je nemusí při každém
+    volání znovu zpracovávat. Jinak se použije běžná system_instruction.
+    """
+    now = time.monotonic()
+    with _ANALYSIS_MODELS_LOCK:
+        entry = _ANALYSIS_MODELS.get(model_name)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+    try:
+        cached = caching.CachedContent.create(
+            model=model_name,
+            system_instruction=_ANALYSIS_INSTRUCTIONS,
+            ttl=_CONTEXT_CACHE_TTL,
+        )
+        model = genai.GenerativeModel.from_cached_content(cached)
+        expires = now + _CONTEXT_CACHE_REFRESH
+    except Exception as e:
+        # Context caching vyžaduje konkrétní verze modelů a minimální délku
+        # obsahu - když není k dispozici, instrukce pošleme klasicky
+        logger.info("Context caching není k dispozici (%s), "
+                    "používám system_instruction", e)
+        model = genai.GenerativeModel(model_name,
+                                      system_instruction=_ANALYSIS_INSTRUCTIONS)
+        expires = float("inf")
+
+    with _ANALYSIS_MODELS_LOCK:
+        _ANALYSIS_MODELS[model_name] = (expires, model)
+    return model
+
+@lru_cache(maxsize=None)
+def _get_chat_model(model_name: str) -> genai.GenerativeModel:
+    """Vrátí cachovaný generativní model se systémovou instrukcí pro chat."""
+    return genai.GenerativeModel(model_name, system_instruction=SYSTEM_PROMPT)
+
 def get_chat_response(
-    messages: List[Dict[str, str]], 
+    messages: List[Dict[str, str]],
     model_name: str = "gemini-1.5-pro"
 ) -> Optional[str]:
     """
     Získá odpověď na chat zprávy od Gemini AI.
-    
+
     Args:
         messages: Seznam zpráv ve formátu [{"role": "user", "content": "Zpráva"}, ...]
         model_name: Název modelu Gemini, který se má použít
-        
+
     Returns:
         Odpověď od AI asistenta nebo None v případě chyby
     """
-    if not initialize_gemini():
+    if not messages or not initialize_gemini():
         return None
-    
-    # Implementace opakování pokusů při selhání    
+
+    # Cachovaný model a zformátovaná historie se mezi pokusy nemění,
+    # připravíme je proto jednou před retry smyčkou
+    model = _get_chat_model(model_name)
+
+    # Příprava historie pro Gemini API (vše kromě poslední zprávy)
+    formatted_messages = []
+    for msg in messages[:-1]:
+        role = "user" if msg["role"] == "user" else "model"
+        formatted_messages.append({"role": role, "parts": [msg["content"]]})
+
+    # Implementace opakování pokusů při selhání
     for attempt in range(MAX_RETRIES):
         try:
-            # Vytvoříme generativní model
-            model = genai.GenerativeModel(model_name)
-            
-            # Příprava formátu zpráv pro Gemini API
-            formatted_messages = []
-            for msg in messages:
-                role = "user" if msg["role"] == "user" else "model"
-                formatted_messages.append({"role": role, "parts": [msg["content"]]})
-            
-            # Získáme odpověď
-            chat = model.start_chat(history=formatted_messages)
-            response = chat.send_message("Odpověz v Českém jazyce. Jsi finanční asistent, který pomáhá s analýzou finančních trhů a komodit. Zaměřuješ se na analýzu zlata (GOLD, XAU/USD), měnových párů a dalších finančních instrumentů.")
-            
+            # Odešleme pouze poslední zprávu - systémová instrukce je součástí
+            # modelu a neprochází historií chatu; chat vytváříme pro každý
+            # pokus znovu, aby neúspěšný pokus nezanechal rozbitou historii
+            with _gemini_call_slot():
+                chat = model.start_chat(history=formatted_messages)
+                response = chat.send_message(
+                    messages[-1]["content"],
+                    request_options={"timeout": REQUEST_TIMEOUT})
+
             return response.text
+        except _FATAL_ERRORS as e:
+            logger.error("Neopakovatelná chyba Gemini API: %s", e)
+            return None
         except Exception as e:
-            print(f"Chyba při získávání odpovědi od Gemini (pokus {attempt+1}/{MAX_RETRIES}): {e}")
+            logger.warning("Chyba při získávání odpovědi od Gemini (pokus %d/%d): %s",
+                           attempt + 1, MAX_RETRIES, e)
             if attempt < MAX_RETRIES - 1:
-                print(f"Zkouším znovu za {RETRY_DELAY} sekund...")
-                time.sleep(RETRY_DELAY)
+                delay = _retry_delay(attempt, e)
+                logger.warning("Zkouším znovu za %.1f sekund...", delay)
+                time.sleep(delay)
             else:
                 return None
 
+def _build_analysis_prompt(
+    symbol: str,
+    price_data: Dict[str, Any],
+    historical_data: Any = None
+) -> str:
+    """
+    Sestaví detailní prompt pro finanční analýzu z aktuálních a historických dat.
+
+    Args:
+        symbol: Ticker symbolu (např. 'EUR/USD', 'AAPL')
+        price_data: Slovník s daty o aktuální kotaci
+        historical_data: DataFrame s historickými daty z 5M timeframe (volitelný)
+
+    Returns:
+        Kompletní prompt pro Gemini API
+    """
+    # Určení typu instrumentu pro lepší analýzu
+    instrument_type = _INSTRUMENT_MAP.get(
+        symbol, "měnový pár" if "/" in symbol else "komodita")
+
+    # Aktuální cena a základní údaje
+    current_price = price_data.get('close', price_data.get('price', 0))
+
+    # Prompt skládáme jako seznam částí a spojíme ho jednou na konci,
+    # abychom se vyhnuli opakované konkatenaci řetězců
+    parts = [f"""
+    Jsi profesionální obchodník a finanční analytik se zaměřením na trhy.
+    Poskytni detailní analýzu s konkrétními obchodními signály pro {symbol} ({instrument_type}).
+
+    Aktuální reálná data:
+    - Aktuální cena: {current_price} {price_data.get('currency', 'USD')}
+    - Změna: {price_data.get('percent_change', 0)}%
+    - Otevírací cena: {price_data.get('open', 0)}
+    - Nejvyšší cena: {price_data.get('high', 0)}
+    - Nejnižší cena: {price_data.get('low', 0)}
+    - Předchozí zavírací cena: {price_data.get('previous_close', 0)}
+    - Datum/čas: {price_data.get('datetime', 'Není k dispozici')}
+    """]
+
+    # Přidání historických dat, pokud jsou k dispozici
+    if historical_data is not None and not historical_data.empty:
+        # Omezíme pracovní sadu jen na sloupce, které prompt skutečně používá,
+        # a ceny zmenšíme na float32 - DataFrame jinak zůstává živý po celou
+        # dobu komunikace s Gemini API
+        cols = [c for c in ('date', 'datetime', 'open', 'high', 'low', 'close',
+                            'volume', 'sma_20', 'sma_50', 'ema_20', 'ema_50',
+                            'rsi_14') if c in historical_data.columns]
+        price_cols = [c for c in ('open', 'high', 'low', 'close') if c in cols]
+        historical_data = historical_data[cols].astype(
+            {c: 'float32' for c in price_cols}, copy=False)
+
+        # Posledních 12 záznamů rovnou v opačném pořadí (nejnovější nahoře) -
+        # jediný zpětný řez místo tail() + reversed() přes mezilehlý seznam;
+        # delší okno jen zvyšovalo počet vstupních tokenů bez přínosu
+        max_rows = 12
+        recent_data = historical_data.iloc[-max_rows:][::-1]
+
+        parts.append("""
+        Poslední historická data (nejnovější nahoře):
+        """)
+
+        # Přidání historických dat - datum znormalizujeme jedním vektorovým
+        # převodem (může být ve sloupci 'date' nebo 'datetime') a řádky
+        # poskládáme ze zipu polí místo pomalého iterrows()
+        date_col = 'date' if 'date' in recent_data.columns else (
+            'datetime' if 'datetime' in recent_data.columns else None)
+        if date_col is not None:
+            date_strs = (pd.to_datetime(recent_data[date_col], errors='coerce')
+                         .dt.strftime('%Y-%m-%d %H:%M')
+                         .fillna('N/A')
+                         .to_numpy())
+        else:
+            date_strs = np.full(len(recent_data), 'N/A', dtype=object)
+
+        if 'volume' in recent_data.columns:
+            volumes = recent_data['volume'].to_numpy()
+        else:
+            volumes = np.full(len(recent_data), 'N/A', dtype=object)
+
+        data_lines = [
+            f"{d}: O: {o:.2f}, H: {h:.2f}, L: {l:.2f}, C: {c:.2f}, Vol: {v}"
+            for d, o, h, l, c, v in zip(date_strs,
+                                        recent_data['open'].to_numpy(),
+                                        recent_data['high'].to_numpy(),
+                                        recent_data['low'].to_numpy(),
+                                        recent_data['close'].to_numpy(),
+                                        volumes)
+        ]
+
+        parts.append("\n".join(data_lines))
+
+        # Výpočet některých technických indikátorů
+        # Průměrná změna za posledních N období
+        if len(historical_data) > 1:
+            closes = historical_data['close'].to_numpy()
+            price_changes = np.diff(closes) / closes[:-1]
+            avg_change = price_changes.mean() * 100
+            volatility = price_changes.std(ddof=1) * 100
+
+            # Výpočet klíčových úrovní podpory a odporu
+            last_price = closes[-1]
+            recent_highs = historical_data['high'].to_numpy()[-30:]
+            recent_lows = historical_data['low'].to_numpy()[-30:]
+
+            # Najdeme 3 nejbližší úrovně pomocí částečného řazení (O(n) místo plného sortu)
+            above = recent_highs[recent_highs > last_price]
+            if above.size:
+                resistance_levels = np.sort(np.partition(above, min(3, above.size) - 1)[:3])
+            else:
+                resistance_levels = above
+
+            below = recent_lows[recent_lows < last_price]
+            if below.size:
+                support_levels = np.sort(-np.partition(-below, min(3, below.size) - 1)[:3])[::-1]
+            else:
+                support_levels = below
+
+            parts.append(f"""
+            Technické ukazatele (5-minutový timeframe):
+            - Průměrná procentuální změna: {avg_change:.4f}%
+            - Volatilita (směrodatná odchylka): {volatility:.4f}%
+            """)
+
+            # Přidání úrovní podpory a odporu
+            if resistance_levels.size:
+                parts.append(f"- Úrovně odporu (resistance): {', '.join([f'{level:.2f}' for level in resistance_levels])}\n")
+            if support_levels.size:
+                parts.append(f"- Úrovně podpory (support): {', '.join([f'{level:.2f}' for level in support_levels])}\n")
+
+            # Poslední hodnoty indikátorů vytáhneme jedním přístupem do
+            # NumPy pole místo opakovaného historical_data.iloc[-1]
+            indicator_cols = [c for c in ('sma_20', 'sma_50', 'ema_20',
+                                          'ema_50', 'rsi_14')
+                              if c in historical_data.columns]
+            latest = dict(zip(indicator_cols,
+                              historical_data[indicator_cols].to_numpy()[-1]))
+
+            # Přidání SMA a EMA, pokud jsou k dispozici
+            if 'sma_20' in latest and 'sma_50' in latest:
+                parts.append(f"""
+                - SMA 20: {latest['sma_20']:.2f}
+                - SMA 50: {latest['sma_50']:.2f}
+                - SMA křížení: {"SMA 20 nad SMA 50 (býčí)" if latest['sma_20'] > latest['sma_50'] else "SMA 50 nad SMA 20 (medvědí)"}
+                """)
+
+            if 'ema_20' in latest and 'ema_50' in latest:
+                parts.append(f"""
+                - EMA 20: {latest['ema_20']:.2f}
+                - EMA 50: {latest['ema_50']:.2f}
+                - EMA křížení: {"EMA 20 nad EMA 50 (býčí)" if latest['ema_20'] > latest['ema_50'] else "EMA 50 nad EMA 20 (medvědí)"}
+                """)
+
+            # RSI pokud je k dispozici
+            if 'rsi_14' in latest:
+                parts.append(f"""
+                - RSI(14): {latest['rsi_14']:.2f} ({"Překoupený" if latest['rsi_14'] > 70 else "Přeprodaný" if latest['rsi_14'] < 30 else "Neutrální"})
+                """)
+
+    # Instrukce pro multi-timeframe analýzu s konkrétními obchodními signály založenými na pokročilých konceptech
+
+    return "".join(parts)
+
+def get_financial_analysis_stream(
+    symbol: str,
+    price_data: Dict[str, Any],
+    historical_data: Any = None,
+    model_name: str = "gemini-1.5-pro"
+) -> Iterator[str]:
+    """
+    Streamuje finanční analýzu pro daný symbol od Gemini AI po částech.
+    Jednotlivé části odpovědi jsou k dispozici okamžitě, jakmile je model
+    vygeneruje — snižuje se tím čas do prvního tokenu a dlouhé analýzy
+    nenarazí na timeout brány (CloudFlare 524).
+
+    Args:
+        symbol: Ticker symbolu (např. 'EUR/USD', 'AAPL')
+        price_data: Slovník s daty o aktuální kotaci
+        historical_data: DataFrame s historickými daty z 5M timeframe (volitelný)
+        model_name: Název modelu Gemini, který se má použít
+
+    Yields:
+        Části textu finanční analýzy v pořadí, v jakém je model generuje
+    """
+    if not initialize_gemini():
+        return
+
+    # Cachovaný generativní model a sestavený prompt
+    model = _get_model(model_name)
+    prompt = _build_analysis_prompt(symbol, price_data, historical_data)
+
+    # Streamovaná odpověď - jednotlivé části předáváme hned dál
+    response = model.generate_content(
+        prompt, stream=True, request_options={"timeout": REQUEST_TIMEOUT})
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+async def get_financial_analysis_stream_async(
+    symbol: str,
+    price_data: Dict[str, Any],
+    historical_data: Any = None,
+    model_name: str = "gemini-1.5-pro"
+) -> AsyncIterator[str]:
+    """
+    Asynchronní varianta get_financial_analysis_stream.
+    Vhodná pro napojení na SSE/WebSocket ve webové vrstvě.
+
+    Args:
+        symbol: Ticker symbolu (např. 'EUR/USD', 'AAPL')
+        price_data: Slovník s daty o aktuální kotaci
+        historical_data: DataFrame s historickými daty z 5M timeframe (volitelný)
+        model_name: Název modelu Gemini, který se má použít
+
+    Yields:
+        Části textu finanční analýzy v pořadí, v jakém je model generuje
+    """
+    if not initialize_gemini():
+        return
+
+    # Vytvoříme generativní model; CPU-náročné sestavení promptu (pandas,
+    # numpy, formátování) odsuneme do vlákna, aby neblokovalo event loop
+    # ostatním souběžným voláním
+    model = _get_model(model_name)
+    prompt = await asyncio.to_thread(
+        _build_analysis_prompt, symbol, price_data, historical_data)
+
+    # Streamovaná odpověď - jednotlivé části předáváme hned dál
+    # asyncio.wait_for zastropuje čekání na zahájení odpovědi, aby případný
+    # retry mohl vystřelit nový (obvykle rychlejší) požadavek
+    response = await asyncio.wait_for(
+        model.generate_content_async(prompt, stream=True),
+        timeout=REQUEST_TIMEOUT)
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+def get_financial_analyses_batch(
+    jobs: List[Tuple[str, Dict[str, Any], Any]],
+    model_name: str = "gemini-1.5-pro"
+) -> List[Optional[str]]:
+    """
+    Získá finanční analýzy pro více symbolů v jedné dávce.
+
+    Instalovaná verze SDK nenabízí serverové dávkové API, dávku proto
+    odbavíme souběžně přes jeden sdílený klient - TCP/TLS spojení a
+    autentizace se amortizují přes celou dávku místo N sériových volání.
+
+    Args:
+        jobs: Seznam trojic (symbol, price_data, historical_data)
+        model_name: Název modelu Gemini, který se má použít
+
+    Returns:
+        Seznam analýz ve stejném pořadí jako jobs; None tam, kde volání selhalo
+    """
+    if not jobs:
+        return []
+
+    if not initialize_gemini():
+        return [None] * len(jobs)
+
+    # Všechny prompty sestavíme předem, jeden (cachovaný) model pro celou dávku
+    model = _get_model(model_name)
+    prompts = [_build_analysis_prompt(symbol, price_data, historical_data)
+               for symbol, price_data, historical_data in jobs]
+
+    async def _run_batch() -> List[Optional[str]]:
+        async def _one(prompt: str) -> Optional[str]:
+            try:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt),
+                    timeout=REQUEST_TIMEOUT)
+                return response.text
+            except Exception as e:
+                logger.warning("Chyba při dávkové finanční analýze: %s", e)
+                return None
+
+        return list(await asyncio.gather(*(_one(p) for p in prompts)))
+
+    return asyncio.run(_run_batch())
+
+def _analysis_cache_key(
+    symbol: str,
+    price_data: Dict[str, Any],
+    historical_data: Any,
+    model_name: str
+) -> str:
+    """Sestaví klíč cache analýzy ze symbolu, zaokrouhlené ceny a otisku dat."""
+    current_price = price_data.get('close', price_data.get('price', 0))
+    try:
+        price_key = round(float(current_price), 2)
+    except (TypeError, ValueError):
+        price_key = current_price
+
+    if historical_data is not None and not historical_data.empty:
+        data_hash = int(pd.util.hash_pandas_object(historical_data.tail(30)).sum())
+    else:
+        data_hash = 0
+
+    return f"{symbol}|{price_key}|{data_hash}|{model_name}"
+
 def get_financial_analysis(
-    symbol: str, 
+    symbol: str,
     price_data: Dict[str, Any],
     historical_data: Any = None,
     model_name: str = "gemini-1.5-pro"
@@ -123,228 +708,220 @@ def get_financial_analysis(
     Získá finanční analýzu a doporučení pro daný symbol od Gemini AI.
     Používá multi-timeframe analýzu s daty z 5M, H1, H4 a D1 timeframů.
     Poskytuje konkrétní obchodní signály s cíli zisku odvozenými z vyšších timeframů.
-    
+    Interně používá streamovanou odpověď a vrací ji spojenou do jednoho textu.
+
     Args:
         symbol: Ticker symbolu (např. 'EUR/USD', 'AAPL')
         price_data: Slovník s daty o aktuální kotaci
         historical_data: DataFrame s historickými daty z 5M timeframe (volitelný)
         model_name: Název modelu Gemini, který se má použít
-        
+
     Returns:
         Finanční analýza od AI asistenta nebo None v případě chyby
     """
     if not initialize_gemini():
         return None
-    
-    # Implementace opakování pokusů při selhání    
+
+    # Nejprve zkusíme cache - stejný symbol se stejnou cenou a daty vrací
+    # během TTL stejnou analýzu bez dalšího volání API
+    cache_key = _analysis_cache_key(symbol, price_data, historical_data, model_name)
+    with _ANALYSIS_CACHE_LOCK:
+        cached = _ANALYSIS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Model a prompt sestavíme jednou - při retry se opakuje jen samotné
+    # volání API, ne formátování dat přes pandas/numpy
+    model = _get_model(model_name)
+    prompt = _build_analysis_prompt(symbol, price_data, historical_data)
+
+    # Implementace opakování pokusů při selhání
+    for attempt in range(MAX_RETRIES):
+        try:
+            # Spojíme streamované části do jednoho textu; slot hlídá RPM
+            # okno a AIMD souběžnost
+            with _gemini_call_slot():
+                response = model.generate_content(
+                    prompt, stream=True,
+                    request_options={"timeout": REQUEST_TIMEOUT})
+                analysis = "".join(
+                    chunk.text for chunk in response if chunk.text)
+
+            if analysis:
+                with _ANALYSIS_CACHE_LOCK:
+                    _ANALYSIS_CACHE[cache_key] = analysis
+
+            return analysis or None
+
+        except _FATAL_ERRORS as e:
+            logger.error("Neopakovatelná chyba Gemini API: %s", e)
+            return None
+        except Exception as e:
+            logger.warning("Chyba při získávání finanční analýzy od Gemini (pokus %d/%d): %s",
+                           attempt + 1, MAX_RETRIES, e)
+            if attempt < MAX_RETRIES - 1:
+                delay = _retry_delay(attempt, e)
+                logger.warning("Zkouším znovu za %.1f sekund...", delay)
+                time.sleep(delay)
+            else:
+                return None
+
+async def aget_chat_response(
+    messages: List[Dict[str, str]],
+    model_name: str = "gemini-1.5-pro"
+) -> Optional[str]:
+    """
+    Asynchronní varianta get_chat_response.
+
+    Args:
+        messages: Seznam zpráv ve formátu [{"role": "user", "content": "Zpráva"}, ...]
+        model_name: Název modelu Gemini, který se má použít
+
+    Returns:
+        Odpověď od AI asistenta nebo None v případě chyby
+    """
+    if not messages or not initialize_gemini():
+        return None
+
+    # Model a zformátovaná historie se mezi pokusy nemění
+    model = _get_chat_model(model_name)
+
+    formatted_messages = []
+    for msg in messages[:-1]:
+        role = "user" if msg["role"] == "user" else "model"
+        formatted_messages.append({"role": role, "parts": [msg["content"]]})
+
     for attempt in range(MAX_RETRIES):
         try:
-            # Vytvoříme generativní model
-            model = genai.GenerativeModel(model_name)
-            
-            # Určení typu instrumentu pro lepší analýzu
-            instrument_type = "komodita"
-            if symbol == "I:XAUUSD" or symbol == "GOLD" or symbol == "XAU/USD":
-                instrument_type = "zlato"
-            elif symbol == "I:XAGUSD" or symbol == "SILVER" or symbol == "XAG/USD":
-                instrument_type = "stříbro"
-            elif "/" in symbol:
-                instrument_type = "měnový pár"
-            elif symbol in ["AAPL", "MSFT", "GOOG", "AMZN"]:
-                instrument_type = "akcie"
-            
-            # Aktuální cena a základní údaje
-            current_price = price_data.get('close', price_data.get('price', 0))
-            
-            # Sestavíme detailní prompt s reálnými daty pro AI
-            prompt = f"""
-            Jsi profesionální obchodník a finanční analytik se zaměřením na trhy.
-            Poskytni detailní analýzu s konkrétními obchodními signály pro {symbol} ({instrument_type}).
-            
-            Aktuální reálná data:
-            - Aktuální cena: {current_price} {price_data.get('currency', 'USD')}
-            - Změna: {price_data.get('percent_change', 0)}%
-            - Otevírací cena: {price_data.get('open', 0)}
-            - Nejvyšší cena: {price_data.get('high', 0)}
-            - Nejnižší cena: {price_data.get('low', 0)}
-            - Předchozí zavírací cena: {price_data.get('previous_close', 0)}
-            - Datum/čas: {price_data.get('datetime', 'Není k dispozici')}
-            """
-            
-            # Přidání historických dat, pokud jsou k dispozici
-            if historical_data is not None and not historical_data.empty:
-                # Získáme více záznamů pro lepší analýzu
-                max_rows = 30
-                
-                # Získáme nejnovější záznamy
-                recent_data = historical_data.tail(max_rows)
-                
-                prompt += """
-                Poslední historická data (nejnovější nahoře):
-                """
-                
-                # Přidání historických dat
-                data_lines = []
-                for index, row in recent_data.iterrows():
-                    # Ošetření správného formátu datumu (může být ve sloupci 'date' nebo 'datetime')
-                    date_str = ""
-                    if 'date' in row and pd.notna(row['date']):
-                        if isinstance(row['date'], str):
-                            date_str = row['date']
-                        else:
-                            try:
-                                date_str = row['date'].strftime('%Y-%m-%d %H:%M')
-                            except:
-                                date_str = str(row['date'])
-                    elif 'datetime' in row and pd.notna(row['datetime']):
-                        if isinstance(row['datetime'], str):
-                            date_str = row['datetime']
-                        else:
-                            try:
-                                date_str = row['datetime'].strftime('%Y-%m-%d %H:%M')
-                            except:
-                                date_str = str(row['datetime'])
-                    else:
-                        date_str = "N/A"
-                    
-                    # Formátování datového řádku
-                    data_lines.append(f"{date_str}: O: {row['open']:.2f}, H: {row['high']:.2f}, L: {row['low']:.2f}, C: {row['close']:.2f}, Vol: {row.get('volume', 'N/A')}")
-                
-                prompt += "\n".join(reversed(data_lines[-20:]))  # Posledních 20 řádků v opačném pořadí (nejnovější nahoře)
-                    
-                # Výpočet některých technických indikátorů
-                # Průměrná změna za posledních N období
-                if len(historical_data) > 1:
-                    price_changes = historical_data['close'].pct_change().dropna()
-                    avg_change = price_changes.mean() * 100
-                    volatility = price_changes.std() * 100
-                    
-                    # Výpočet klíčových úrovní podpory a odporu
-                    last_price = historical_data['close'].iloc[-1]
-                    recent_highs = historical_data['high'].tail(30)
-                    recent_lows = historical_data['low'].tail(30)
-                    
-                    # Najdeme lokální maxima a minima
-                    resistance_levels = sorted([price for price in recent_highs if price > last_price])[:3]
-                    support_levels = sorted([price for price in recent_lows if price < last_price], reverse=True)[:3]
-                    
-                    prompt += f"""
-                    Technické ukazatele (5-minutový timeframe):
-                    - Průměrná procentuální změna: {avg_change:.4f}%
-                    - Volatilita (směrodatná odchylka): {volatility:.4f}%
-                    """
-                    
-                    # Přidání úrovní podpory a odporu
-                    if resistance_levels:
-                        prompt += f"- Úrovně odporu (resistance): {', '.join([f'{level:.2f}' for level in resistance_levels])}\n"
-                    if support_levels:
-                        prompt += f"- Úrovně podpory (support): {', '.join([f'{level:.2f}' for level in support_levels])}\n"
-                    
-                    # Přidání SMA a EMA, pokud jsou k dispozici
-                    if 'sma_20' in historical_data.columns and 'sma_50' in historical_data.columns:
-                        latest = historical_data.iloc[-1]
-                        prompt += f"""
-                        - SMA 20: {latest['sma_20']:.2f}
-                        - SMA 50: {latest['sma_50']:.2f}
-                        - SMA křížení: {"SMA 20 nad SMA 50 (býčí)" if latest['sma_20'] > latest['sma_50'] else "SMA 50 nad SMA 20 (medvědí)"}
-                        """
-                    
-                    if 'ema_20' in historical_data.columns and 'ema_50' in historical_data.columns:
-                        latest = historical_data.iloc[-1]
-                        prompt += f"""
-                        - EMA 20: {latest['ema_20']:.2f}
-                        - EMA 50: {latest['ema_50']:.2f}
-                        - EMA křížení: {"EMA 20 nad EMA 50 (býčí)" if latest['ema_20'] > latest['ema_50'] else "EMA 50 nad EMA 20 (medvědí)"}
-                        """
-                    
-                    # RSI pokud je k dispozici
-                    if 'rsi_14' in historical_data.columns:
-                        latest = historical_data.iloc[-1]
-                        prompt += f"""
-                        - RSI(14): {latest['rsi_14']:.2f} ({"Překoupený" if latest['rsi_14'] > 70 else "Přeprodaný" if latest['rsi_14'] < 30 else "Neutrální"})
-                        """
-            
-            # Instrukce pro multi-timeframe analýzu s konkrétními obchodními signály založenými na pokročilých konceptech
-            prompt += """
-            Proveď MULTI-TIMEFRAME ANALÝZU pomocí pokročilých obchodních konceptů a poskytni následující:
-            
-            1. Shrnutí aktuální situace na trhu:
-               - Analýza hlavního trendu na denním (D1) timeframe
-               - Identifikace klíčových HTF (Higher Time Frame) úrovní a struktury trhu
-               - Určení hlavních supply/demand zón a order bloků (OB) z D1 a H4 timeframu
-            
-            2. SMC/ICT analýza na H1 (hodinovém) timeframe:
-               - Identifikace FVG (Fair Value Gap), BOS (Break of Structure), CHOCH (Change of Character)
-               - Liquidity sweep/grab (PWH - Previous Week High, PWL - Previous Week Low)
-               - Imbalance (IMB) a mitigation
-               - ICT koncepty - OTE (Optimal Trade Entry), BPR (Buy-side/Sell-side Premium Zones)
-            
-            3. KONKRÉTNÍ OBCHODNÍ SIGNÁLY PRO 5M TIMEFRAME:
-               - Doporučení pro NÁKUP nebo PRODEJ (případně VYČKÁNÍ)
-               - PŘESNÁ vstupní cena založená na:
-                  * SMC/ICT konceptech (POI - Point of Interest, IFC - Institutional Flow Concepts)
-                  * Order block (OB) nebo Fair Value Gap (FVG)
-                  * IPA (Institutional Price Action) a BOS/FBOS (Break/Fake Break of Structure)
-                  * SOW/SOS (Sign of Weakness/Strength)
-            
-               - PŘESNÁ cena pro stoploss (na základě SMC/ICT konceptů):
-                  * SL MUSÍ být umístěn za úrovněmi likvidity (LQD)
-                  * SL MUSÍ být za BSL/SSL (Buy/Sell Side Liquidity) nebo order blokem
-                  * SL MUSÍ být minimálně 2 body od vstupní ceny
-                  * SL MUSÍ respektovat D2S/S2D (Demand to Supply, Supply to Demand) logiku
-            
-               - PŘESNÉ cíle zisku založené na SMC/ICT:
-                  * TP1: krátkodobý cíl (založený na nejbližším FVG/IMB) - minimálně 40 pipů (4 body) od vstupní ceny
-                  * TP2: střednědobý cíl (založený na EQH/EQL - Equal High/Low nebo HTF FVG)
-                  * TP3: dlouhodobý cíl (založený na main HTF supply/demand zónách, OB, FVG, IMB)
-               
-               - Výpočet poměru rizika k zisku (Risk:Reward ratio) - VŽDY DOPORUČUJ POUZE OBCHODY S POMĚREM RIZIKA K ZISKU MINIMÁLNĚ 1:2,5
-            
-            4. SMC/ICT rizikové faktory a poznámky:
-               - Manipulace likvidity (liquidity engineering)
-               - Stop hunts a smart money flow
-               - Doporučení pro částečné uzavírání pozice na jednotlivých TP úrovních
-               - Respektování TL (Trendline) a SnR (Support/Resistance)
-            
-            Formátuj výstup pomocí markdown a používej vhodné nadpisy a odrážky pro přehlednost.
-            Odpověz v češtině. Buď konkrétní a přesný, zejména v číslech pro vstup, stoploss a take profit.
-            
-            DŮLEŽITÉ PARAMETRY & VYSVĚTLENÍ ZKRATEK:
-            - SMC = Smart Money Concept
-            - ICT = Inner Circle Trader metodologie
-            - OB = Order Block (oblasti, kde instituce vstupují do trhu)
-            - FVG = Fair Value Gap (mezera v ceně, která bude pravděpodobně vyplněna)
-            - IMB = Imbalance (nerovnováha v order flow)
-            - BOS/FBOS = Break/Fake Break of Structure (průlom/falešný průlom struktury)
-            - CHOCH = Change of Character (změna charakteru ceny, často následuje po akumulaci)
-            - HTF/LTF = Higher/Lower Time Frame (vyšší/nižší časový rámec)
-            - EQH/EQL = Equal High/Low (stejné vrcholy/dna - cílové oblasti)
-            - POI = Point of Interest (oblast zájmu pro vstup)
-            - SnR = Support/Resistance (podpora/odpor)
-            - D2S/S2D = Demand to Supply, Supply to Demand (oblasti přechodu z poptávky do nabídky a naopak)
-            - BSL/SSL = Buy Side Liquidity / Sell Side Liquidity (likvidita pro nákupy/prodeje)
-            - TL = Trendline (trendová linie)
-            - PWH/PWL = Previous Week High/Low (high/low předchozího týdne)
-            - SOW/SOS = Sign of Weakness/Strength (známka slabosti/síly)
-            - LQD = Liquidity (likvidita - oblasti stop lossů)
-            
-            - Vstup a SL určuj přesně na základě SMC/ICT konceptů z 5M grafu
-            - SL MUSÍ být za likviditou, OB nebo FVG
-            - TP1 MUSÍ být minimálně 40 pipů (4 body) od vstupní ceny
-            - Doporučuj POUZE obchody s min. poměrem rizika k zisku 1:2,5
-            - Předpokládej max. trvání obchodu 3 hodiny
-            - Pokud aktuální situace neumožňuje vhodný ICT/SMC setup, doporuč VYČKÁNÍ
-            """
-            
-            # Získáme odpověď
-            response = model.generate_content(prompt)
-            
+            chat = model.start_chat(history=formatted_messages)
+            response = await asyncio.wait_for(
+                chat.send_message_async(messages[-1]["content"]),
+                timeout=REQUEST_TIMEOUT)
+
             return response.text
-            
+        except _FATAL_ERRORS as e:
+            logger.error("Neopakovatelná chyba Gemini API: %s", e)
+            return None
+        except Exception as e:
+            logger.warning("Chyba při získávání odpovědi od Gemini (pokus %d/%d): %s",
+                           attempt + 1, MAX_RETRIES, e)
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(_retry_delay(attempt, e))
+            else:
+                return None
+
+async def aget_financial_analysis(
+    symbol: str,
+    price_data: Dict[str, Any],
+    historical_data: Any = None,
+    model_name: str = "gemini-1.5-pro"
+) -> Optional[str]:
+    """
+    Asynchronní varianta get_financial_analysis. Sdílí cache analýz se
+    synchronní cestou, takže opakované dotazy neplatí další volání API.
+
+    Args:
+        symbol: Ticker symbolu (např. 'EUR/USD', 'AAPL')
+        price_data: Slovník s daty o aktuální kotaci
+        historical_data: DataFrame s historickými daty z 5M timeframe (volitelný)
+        model_name: Název modelu Gemini, který se má použít
+
+    Returns:
+        Finanční analýza od AI asistenta nebo None v případě chyby
+    """
+    if not initialize_gemini():
+        return None
+
+    cache_key = _analysis_cache_key(symbol, price_data, historical_data, model_name)
+    with _ANALYSIS_CACHE_LOCK:
+        cached = _ANALYSIS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Model a prompt sestavíme jednou; CPU-náročné formátování odsuneme
+    # do vlákna, aby neblokovalo event loop
+    model = _get_model(model_name)
+    prompt = await asyncio.to_thread(
+        _build_analysis_prompt, symbol, price_data, historical_data)
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, stream=True),
+                timeout=REQUEST_TIMEOUT)
+            analysis = "".join(
+                [chunk.text async for chunk in response if chunk.text])
+
+            if analysis:
+                with _ANALYSIS_CACHE_LOCK:
+                    _ANALYSIS_CACHE[cache_key] = analysis
+
+            return analysis or None
+        except _FATAL_ERRORS as e:
+            logger.error("Neopakovatelná chyba Gemini API: %s", e)
+            return None
         except Exception as e:
-            print(f"Chyba při získávání finanční analýzy od Gemini (pokus {attempt+1}/{MAX_RETRIES}): {e}")
+            logger.warning("Chyba při získávání finanční analýzy od Gemini (pokus %d/%d): %s",
+                           attempt + 1, MAX_RETRIES, e)
             if attempt < MAX_RETRIES - 1:
-                print(f"Zkouším znovu za {RETRY_DELAY} sekund...")
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(_retry_delay(attempt, e))
             else:
-                return None
\ No newline at end of file
+                return None
+
+async def analyze_many(
+    symbols: List[str],
+    price_data_map: Dict[str, Dict[str, Any]],
+    historical_map: Optional[Dict[str, Any]] = None,
+    model_name: str = "gemini-1.5-pro"
+) -> List[Optional[str]]:
+    """
+    Analyzuje více symbolů souběžně pomocí asyncio.gather.
+
+    Args:
+        symbols: Seznam symbolů k analýze
+        price_data_map: Mapa symbol -> data o aktuální kotaci
+        historical_map: Mapa symbol -> historická data (volitelná)
+        model_name: Název modelu Gemini, který se má použít
+
+    Returns:
+        Seznam analýz ve stejném pořadí jako symbols
+    """
+    historical_map = historical_map or {}
+    return list(await asyncio.gather(*(
+        aget_financial_analysis(
+            symbol, price_data_map.get(symbol, {}), historical_map.get(symbol),
+            model_name)
+        for symbol in symbols)))
+
+def analyze_symbols(
+    symbols: List[str],
+    price_data_map: Dict[str, Dict[str, Any]],
+    historical_map: Optional[Dict[str, Any]] = None,
+    model_name: str = "gemini-1.5-pro"
+) -> List[Optional[str]]:
+    """
+    Analyzuje více symbolů souběžně přes sdílený pool vláken.
+
+    Synchronní obdoba analyze_many pro volající bez event loopu - všechny
+    požadavky se rozešlou najednou a pevná režie na volání se tak amortizuje.
+
+    Args:
+        symbols: Seznam symbolů k analýze
+        price_data_map: Mapa symbol -> data o aktuální kotaci
+        historical_map: Mapa symbol -> historická data (volitelná)
+        model_name: Název modelu Gemini, který se má použít
+
+    Returns:
+        Seznam analýz ve stejném pořadí jako symbols
+    """
+    if not symbols:
+        return []
+
+    historical_map = historical_map or {}
+    futures = [
+        _EXECUTOR.submit(get_financial_analysis, symbol,
+                         price_data_map.get(symbol, {}),
+                         historical_map.get(symbol), model_name)
+        for symbol in symbols
+    ]
+    return [future.result() for future in futures]
@@ -1,9 +1,12 @@
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from operator import attrgetter
+from functools import lru_cache
 import datetime
 
 from trading_strategies import (
@@ -13,45 +16,214 @@ from trading_strategies import (
 from api_service import get_time_series
 from data_processing import prepare_ohlc_data, calculate_technical_indicators
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _load_prepared_data(symbol: str, timeframe: str, lookback: int) -> Optional[pd.DataFrame]:
+    """
+    Načte časovou řadu a spočítá technické indikátory.
+
+    Výsledek se pro stejné (symbol, timeframe, lookback) vrací z cache,
+    takže opakované kliknutí nestahuje data ani nepřepočítává indikátory.
+
+    Args:
+        symbol: Symbol instrumentu (např. 'XAU/USD')
+        timeframe: Časový rámec dat (např. '5min')
+        lookback: Počet historických záznamů
+
+    Returns:
+        DataFrame s OHLC daty a indikátory, nebo None při selhání načtení
+    """
+    historical_data = get_time_series(symbol, timeframe, lookback)
+    if historical_data is None or historical_data.empty:
+        return None
+    historical_data = prepare_ohlc_data(historical_data)
+    return calculate_technical_indicators(historical_data)
+
+# Popisky widgetů - konstanty na úrovni modulu, aby se slovníky
+# (a closures pro format_func) nealokovaly při každém rerunu
+_TIMEFRAME_LABELS = {
+    "1min": "1 minuta",
+    "5min": "5 minut",
+    "15min": "15 minut",
+    "30min": "30 minut",
+    "1h": "1 hodina",
+    "4h": "4 hodiny",
+    "1day": "1 den"
+}
+_DIRECTION_LABELS = {"long": "Pouze long", "short": "Pouze short", "both": "Long i short"}
+
+# Mapa názvů tříd strategií pro rekonstrukci uvnitř cachovaného helperu
+_STRATEGY_CLASSES = {
+    "MovingAverageCrossover": MovingAverageCrossover,
+    "RSIStrategy": RSIStrategy,
+}
+
+@lru_cache(maxsize=32)
+def _parse_take_profits(value: str) -> tuple:
+    """Rozparsuje čárkami oddělené take-profit úrovně; výsledek se pro
+    stejný řetězec vrací z cache."""
+    return tuple(float(x.strip()) for x in value.split(","))
+
+def _hashable_params(params: Dict[str, Any]) -> tuple:
+    """Převede slovník parametrů na setříděnou hashovatelnou tuple
+    (seznamy, např. take_profit_pips, se převedou na tuple)."""
+    return tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v)
+        for k, v in params.items()))
+
+def _closed_trades_soa(trades: List[Trade]) -> Dict[str, Any]:
+    """
+    Převede uzavřené obchody na sloupcová pole (SoA) pro vykreslování.
+
+    Obchody se seřadí podle času výstupu a všechna pole pro equity křivku
+    se spočítají jedním průchodem - záložka výsledků pak při rerunech čte
+    hotová pole místo opakovaných průchodů objekty Trade.
+
+    Args:
+        trades: Seznam obchodů z backtestu
+
+    Returns:
+        Slovník polí exit_time, profit_pct, color a hovertext
+    """
+    sorted_trades = sorted(
+        (t for t in trades
+         if t.status is not TradeStatus.OPEN and t.exit_time is not None),
+        key=attrgetter('exit_time'))
+    n = len(sorted_trades)
+    return {
+        "exit_time": np.array([t.exit_time for t in sorted_trades],
+                              dtype='datetime64[ns]'),
+        "profit_pct": np.fromiter(
+            (t.profit_percentage for t in sorted_trades),
+            dtype=np.float64, count=n),
+        "color": ['green' if t.status is TradeStatus.CLOSED_PROFIT else 'red'
+                  for t in sorted_trades],
+        "hovertext": [
+            f"Obchod {i+1}<br>Typ: {t.trade_type.value}<br>Vstup: {t.entry_price:.2f}<br>Výstup: {t.exit_price:.2f}<br>Zisk/Ztráta: {t.profit_percentage:.2f}%<br>Důvod: {t.exit_reason}"
+            for i, t in enumerate(sorted_trades)
+        ],
+    }
+
+@st.cache_data(show_spinner=False)
+def _run_backtest(strategy_cls_name: str, strategy_name: str,
+                  params: tuple, data: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Spustí backtest strategie a výsledek memoizuje.
+
+    Backtest je deterministický a bez vedlejších efektů, takže opakované
+    spuštění se stejnými parametry a daty se vrátí z cache bez výpočtu.
+
+    Args:
+        strategy_cls_name: Klíč do _STRATEGY_CLASSES
+        strategy_name: Zobrazované jméno strategie
+        params: Parametry jako setříděná tuple dvojic (viz _hashable_params)
+        data: DataFrame s historickými daty a indikátory
+
+    Returns:
+        Slovník s výsledky backtestu (trades, metrics, ...)
+    """
+    parameters = {k: list(v) if isinstance(v, tuple) else v for k, v in params}
+    strategy = _STRATEGY_CLASSES[strategy_cls_name](
+        name=strategy_name, parameters=parameters)
+    return strategy.backtest(data)
+
+@st.cache_data(show_spinner=False)
+def _build_candlestick_chart(data: pd.DataFrame, symbol: str,
+                             timeframe: str) -> go.Figure:
+    """
+    Sestaví candlestick graf historických dat.
+
+    Figura se cachuje podle obsahu dat, symbolu a timeframe - přepnutí
+    nesouvisejícího widgetu tak graf nestaví (ani neserializuje) znovu.
+
+    Args:
+        data: DataFrame s OHLC daty
+        symbol: Symbol instrumentu pro titulek
+        timeframe: Časový rámec pro titulek
+
+    Returns:
+        Plotly figura s candlestick grafem
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=data.index,
+        open=data['open'],
+        high=data['high'],
+        low=data['low'],
+        close=data['close'],
+        name="OHLC"
+    ))
+    fig.update_layout(
+        title=f"Cenový graf - {symbol} ({timeframe})",
+        xaxis_title="Datum/Čas",
+        yaxis_title="Cena",
+        xaxis_rangeslider_visible=False,
+        template="plotly_white"
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _build_comparison(results_key: tuple,
+                      _results: List[Dict[str, Any]]) -> tuple:
+    """
+    Sestaví porovnávací graf a tabulku metrik pro sadu výsledků.
+
+    Cache klíčem jsou jména strategií a jejich metriky (results_key);
+    samotné výsledky se díky podtržítku nehashují, takže se neprochází
+    vnořené objekty Trade.
+
+    Args:
+        results_key: Hashovatelný otisk sady výsledků
+        _results: Seznam výsledků backtestů
+
+    Returns:
+        Dvojice (porovnávací figura, DataFrame metrik)
+    """
+    comparison_fig = plot_strategy_comparison(_results)
+    comparison_df = pd.DataFrame({
+        "Strategie": [r["strategy_name"] for r in _results],
+        "Celkový zisk/ztráta (%)": [f"{r['metrics']['total_profit']:.2f}%" for r in _results],
+        "Win Rate (%)": [f"{r['metrics']['win_rate']*100:.2f}%" for r in _results],
+        "Počet obchodů": [r['metrics']['total_trades'] for r in _results],
+        "Ziskové obchody": [r['metrics']['winning_trades'] for r in _results],
+        "Ztrátové obchody": [r['metrics']['losing_trades'] for r in _results],
+        "Profit Factor": [f"{r['metrics']['profit_factor']:.2f}" for r in _results],
+        "Max. Drawdown (%)": [f"{r['metrics']['max_drawdown']:.2f}%" for r in _results],
+        "Očekávaná hodnota (%)": [f"{r['metrics']['expectancy']:.4f}%" for r in _results],
+    })
+    return comparison_fig, comparison_df
+
 def strategy_comparison_app():
     """
     Hlavní funkce pro aplikaci porovnání obchodních strategií.
     """
     st.title("Interaktivní nástroj pro porovnání obchodních strategií")
     
-    # Sidebar pro výběr instrumentu a časového rozsahu
+    # Sidebar pro výběr instrumentu a časového rozsahu - formulář odloží
+    # rerun až na odeslání, takže úpravy widgetů nepřepočítávají aplikaci
     st.sidebar.header("Nastavení backtestu")
     
-    symbol = st.sidebar.text_input("Symbol (např. XAU/USD, EUR/USD, AAPL)", value="XAU/USD")
-    
-    # Výběr časového rámce pro data
-    timeframe_options = {
-        "1min": "1 minuta", 
-        "5min": "5 minut", 
-        "15min": "15 minut", 
-        "30min": "30 minut", 
-        "1h": "1 hodina", 
-        "4h": "4 hodiny",
-        "1day": "1 den"
-    }
-    timeframe = st.sidebar.selectbox(
-        "Časový rámec pro data",
-        options=list(timeframe_options.keys()),
-        format_func=lambda x: timeframe_options[x],
-        index=1  # Výchozí: 5min
-    )
-    
-    # Počet historických záznamů
-    lookback_period = st.sidebar.slider(
-        "Počet historických záznamů",
-        min_value=50,
-        max_value=1000,
-        value=200,
-        step=50
-    )
-    
-    # Tlačítko pro načtení dat
-    data_load_button = st.sidebar.button("Načíst historická data")
+    with st.sidebar.form("setup_form"):
+        symbol = st.text_input("Symbol (např. XAU/USD, EUR/USD, AAPL)", value="XAU/USD")
+        
+        # Výběr časového rámce pro data
+        timeframe = st.selectbox(
+            "Časový rámec pro data",
+            options=list(_TIMEFRAME_LABELS),
+            format_func=_TIMEFRAME_LABELS.__getitem__,
+            index=1  # Výchozí: 5min
+        )
+        
+        # Počet historických záznamů
+        lookback_period = st.slider(
+            "Počet historických záznamů",
+            min_value=50,
+            max_value=1000,
+            value=200,
+            step=50
+        )
+        
+        # Tlačítko pro načtení dat
+        data_load_button = st.form_submit_button("Načíst historická data")
     
     # Sekce pro strategie
     st.sidebar.header("Aktivní strategie")
@@ -67,15 +239,14 @@ def strategy_comparison_app():
     if 'backtest_results' not in st.session_state:
         st.session_state.backtest_results = []
     
-    # Načtení historických dat
+    # Načtení historických dat - celá pipeline (stažení + příprava +
+    # indikátory) jde přes cachovaný helper
     if data_load_button:
         with st.spinner("Načítám historická data..."):
-            historical_data = get_time_series(symbol, timeframe, lookback_period)
+            historical_data = _load_prepared_data(symbol, timeframe, lookback_period)
             
             if historical_data is not None and not historical_data.empty:
                 st.session_state.historical_data = historical_data
-                st.session_state.historical_data = prepare_ohlc_data(historical_data)
-                st.session_state.historical_data = calculate_technical_indicators(st.session_state.historical_data)
                 st.success(f"Úspěšně načteno {len(historical_data)} záznamů pro {symbol}")
             else:
                 st.error("Nepodařilo se načíst historická data. Zkontrolujte symbol a zkuste to znovu.")
@@ -85,301 +256,302 @@ def strategy_comparison_app():
         # Záložky pro různé sekce
         tabs = st.tabs(["Data", "Nastavení strategií", "Výsledky backtestu", "Porovnání strategií"])
         
-        # Záložka s daty
-        with tabs[0]:
+        # Záložka s daty - fragment omezuje rerun jen na tuto záložku
+        @st.fragment
+        def _data_tab():
             st.header("Historická data")
-            st.dataframe(st.session_state.historical_data.tail(50))
-            
-            # Cenový graf
-            fig = go.Figure()
-            
-            # Candlestick graf
-            fig.add_trace(go.Candlestick(
-                x=st.session_state.historical_data.index,
-                open=st.session_state.historical_data['open'],
-                high=st.session_state.historical_data['high'],
-                low=st.session_state.historical_data['low'],
-                close=st.session_state.historical_data['close'],
-                name="OHLC"
-            ))
+            # Poziční řez místo tail() - bez rezoluce popisků indexu
+            st.dataframe(st.session_state.historical_data.iloc[-50:],
+                         use_container_width=True)
             
-            # Nastavení grafu
-            fig.update_layout(
-                title=f"Cenový graf - {symbol} ({timeframe})",
-                xaxis_title="Datum/Čas",
-                yaxis_title="Cena",
-                xaxis_rangeslider_visible=False,
-                template="plotly_white"
-            )
+            # Cenový graf - cachovaná figura se při nezměněných datech
+            # jen znovu vykreslí
+            fig = _build_candlestick_chart(
+                st.session_state.historical_data, symbol, timeframe)
             
             st.plotly_chart(fig, use_container_width=True)
-        
-        # Záložka s nastavením strategií
-        with tabs[1]:
+
+        # Záložka s nastavením strategií - fragment omezuje rerun jen na tuto záložku
+        @st.fragment
+        def _settings_tab():
             st.header("Nastavení obchodních strategií")
-            
-            # Moving Average Crossover nastavení
-            if use_ma_crossover:
-                st.subheader("Moving Average Crossover")
+
+            # Widgety strategií ve formuláři - posun slideru nevyvolá
+            # rerun, přepočet proběhne až při odeslání
+            with st.form("strategy_form"):
+                # Moving Average Crossover nastavení
+                if use_ma_crossover:
+                    st.subheader("Moving Average Crossover")
                 
-                col1, col2 = st.columns(2)
+                    col1, col2 = st.columns(2)
+                
+                    with col1:
+                        ma_type = st.selectbox(
+                            "Typ klouzavého průměru",
+                            options=["SMA", "EMA"],
+                            index=1,
+                            key="ma_crossover_ma_type"
+                        )
+                    
+                        fast_ma_period = st.slider(
+                            "Období krátkodobého MA",
+                            min_value=3,
+                            max_value=50,
+                            value=9,
+                            step=1,
+                            key="ma_crossover_fast_period"
+                        )
+                    
+                        slow_ma_period = st.slider(
+                            "Období dlouhodobého MA",
+                            min_value=10,
+                            max_value=200,
+                            value=21,
+                            step=1,
+                            key="ma_crossover_slow_period"
+                        )
+                    
+                        trade_direction = st.selectbox(
+                            "Směr obchodování",
+                            options=["long", "short", "both"],
+                            index=2,
+                            format_func=_DIRECTION_LABELS.__getitem__,
+                            key="ma_crossover_trade_direction"
+                        )
+                
+                    with col2:
+                        use_rsi_filter = st.checkbox(
+                            "Použít RSI filtr",
+                            value=False,
+                            key="ma_crossover_use_rsi_filter"
+                        )
+                    
+                        if use_rsi_filter:
+                            rsi_period = st.slider(
+                                "RSI období",
+                                min_value=2,
+                                max_value=30,
+                                value=14,
+                                step=1,
+                                key="ma_crossover_rsi_period"
+                            )
+                        
+                            rsi_overbought = st.slider(
+                                "RSI přeprodanost",
+                                min_value=50,
+                                max_value=90,
+                                value=70,
+                                step=1,
+                                key="ma_crossover_rsi_overbought"
+                            )
+                        
+                            rsi_oversold = st.slider(
+                                "RSI překoupenost",
+                                min_value=10,
+                                max_value=50,
+                                value=30,
+                                step=1,
+                                key="ma_crossover_rsi_oversold"
+                            )
+                    
+                        use_atr_for_sl = st.checkbox(
+                            "Použít ATR pro stop-loss",
+                            value=True,
+                            key="ma_crossover_use_atr_for_sl"
+                        )
+                    
+                        if use_atr_for_sl:
+                            atr_period = st.slider(
+                                "ATR období",
+                                min_value=5,
+                                max_value=30,
+                                value=14,
+                                step=1,
+                                key="ma_crossover_atr_period"
+                            )
+                        
+                            atr_multiplier = st.slider(
+                                "ATR násobič",
+                                min_value=0.5,
+                                max_value=3.0,
+                                value=1.5,
+                                step=0.1,
+                                key="ma_crossover_atr_multiplier"
+                            )
+                        else:
+                            stop_loss_pips = st.slider(
+                                "Stop-loss (% od vstupní ceny)",
+                                min_value=0.1,
+                                max_value=2.0,
+                                value=0.5,
+                                step=0.1,
+                                key="ma_crossover_stop_loss_pips"
+                            )
+                    
+                        take_profit_pips = st.text_input(
+                            "Take-profit úrovně (% od vstupní ceny, oddělené čárkou)",
+                            value="1.25, 2.0, 3.0",
+                            key="ma_crossover_take_profit_pips"
+                        )
+                    
+                        risk_reward_ratio = st.slider(
+                            "Minimální poměr rizika k zisku",
+                            min_value=1.0,
+                            max_value=5.0,
+                            value=2.5,
+                            step=0.1,
+                            key="ma_crossover_risk_reward_ratio"
+                        )
+            
+                # RSI Strategy nastavení
+                if use_rsi_strategy:
+                    st.subheader("RSI Strategy")
                 
-                with col1:
-                    ma_type = st.selectbox(
-                        "Typ klouzavého průměru",
-                        options=["SMA", "EMA"],
-                        index=1,
-                        key="ma_crossover_ma_type"
-                    )
-                    
-                    fast_ma_period = st.slider(
-                        "Období krátkodobého MA",
-                        min_value=3,
-                        max_value=50,
-                        value=9,
-                        step=1,
-                        key="ma_crossover_fast_period"
-                    )
-                    
-                    slow_ma_period = st.slider(
-                        "Období dlouhodobého MA",
-                        min_value=10,
-                        max_value=200,
-                        value=21,
-                        step=1,
-                        key="ma_crossover_slow_period"
-                    )
-                    
-                    trade_direction = st.selectbox(
-                        "Směr obchodování",
-                        options=["long", "short", "both"],
-                        index=2,
-                        format_func=lambda x: {"long": "Pouze long", "short": "Pouze short", "both": "Long i short"}[x],
-                        key="ma_crossover_trade_direction"
-                    )
+                    col1, col2 = st.columns(2)
                 
-                with col2:
-                    use_rsi_filter = st.checkbox(
-                        "Použít RSI filtr",
-                        value=False,
-                        key="ma_crossover_use_rsi_filter"
-                    )
-                    
-                    if use_rsi_filter:
-                        rsi_period = st.slider(
+                    with col1:
+                        rsi_period_strategy = st.slider(
                             "RSI období",
                             min_value=2,
                             max_value=30,
                             value=14,
                             step=1,
-                            key="ma_crossover_rsi_period"
+                            key="rsi_strategy_period"
                         )
-                        
-                        rsi_overbought = st.slider(
-                            "RSI přeprodanost",
+                    
+                        rsi_overbought_strategy = st.slider(
+                            "RSI hranice překoupenosti",
                             min_value=50,
                             max_value=90,
                             value=70,
                             step=1,
-                            key="ma_crossover_rsi_overbought"
+                            key="rsi_strategy_overbought"
                         )
-                        
-                        rsi_oversold = st.slider(
-                            "RSI překoupenost",
+                    
+                        rsi_oversold_strategy = st.slider(
+                            "RSI hranice přeprodanosti",
                             min_value=10,
                             max_value=50,
                             value=30,
                             step=1,
-                            key="ma_crossover_rsi_oversold"
+                            key="rsi_strategy_oversold"
                         )
                     
-                    use_atr_for_sl = st.checkbox(
-                        "Použít ATR pro stop-loss",
-                        value=True,
-                        key="ma_crossover_use_atr_for_sl"
-                    )
-                    
-                    if use_atr_for_sl:
-                        atr_period = st.slider(
-                            "ATR období",
-                            min_value=5,
-                            max_value=30,
-                            value=14,
+                        exit_rsi_level = st.slider(
+                            "RSI úroveň pro výstup",
+                            min_value=30,
+                            max_value=70,
+                            value=50,
                             step=1,
-                            key="ma_crossover_atr_period"
-                        )
-                        
-                        atr_multiplier = st.slider(
-                            "ATR násobič",
-                            min_value=0.5,
-                            max_value=3.0,
-                            value=1.5,
-                            step=0.1,
-                            key="ma_crossover_atr_multiplier"
-                        )
-                    else:
-                        stop_loss_pips = st.slider(
-                            "Stop-loss (% od vstupní ceny)",
-                            min_value=0.1,
-                            max_value=2.0,
-                            value=0.5,
-                            step=0.1,
-                            key="ma_crossover_stop_loss_pips"
+                            key="rsi_strategy_exit_level"
                         )
                     
-                    take_profit_pips = st.text_input(
-                        "Take-profit úrovně (% od vstupní ceny, oddělené čárkou)",
-                        value="1.25, 2.0, 3.0",
-                        key="ma_crossover_take_profit_pips"
-                    )
-                    
-                    risk_reward_ratio = st.slider(
-                        "Minimální poměr rizika k zisku",
-                        min_value=1.0,
-                        max_value=5.0,
-                        value=2.5,
-                        step=0.1,
-                        key="ma_crossover_risk_reward_ratio"
-                    )
-            
-            # RSI Strategy nastavení
-            if use_rsi_strategy:
-                st.subheader("RSI Strategy")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    rsi_period_strategy = st.slider(
-                        "RSI období",
-                        min_value=2,
-                        max_value=30,
-                        value=14,
-                        step=1,
-                        key="rsi_strategy_period"
-                    )
-                    
-                    rsi_overbought_strategy = st.slider(
-                        "RSI hranice překoupenosti",
-                        min_value=50,
-                        max_value=90,
-                        value=70,
-                        step=1,
-                        key="rsi_strategy_overbought"
-                    )
-                    
-                    rsi_oversold_strategy = st.slider(
-                        "RSI hranice přeprodanosti",
-                        min_value=10,
-                        max_value=50,
-                        value=30,
-                        step=1,
-                        key="rsi_strategy_oversold"
-                    )
-                    
-                    exit_rsi_level = st.slider(
-                        "RSI úroveň pro výstup",
-                        min_value=30,
-                        max_value=70,
-                        value=50,
-                        step=1,
-                        key="rsi_strategy_exit_level"
-                    )
-                    
-                    trade_direction_rsi = st.selectbox(
-                        "Směr obchodování",
-                        options=["long", "short", "both"],
-                        index=2,
-                        format_func=lambda x: {"long": "Pouze long", "short": "Pouze short", "both": "Long i short"}[x],
-                        key="rsi_strategy_trade_direction"
-                    )
-                
-                with col2:
-                    use_ma_filter_rsi = st.checkbox(
-                        "Použít MA filtr",
-                        value=False,
-                        key="rsi_strategy_use_ma_filter"
-                    )
-                    
-                    if use_ma_filter_rsi:
-                        ma_type_rsi = st.selectbox(
-                            "Typ klouzavého průměru",
-                            options=["SMA", "EMA"],
-                            index=0,
-                            key="rsi_strategy_ma_type"
+                        trade_direction_rsi = st.selectbox(
+                            "Směr obchodování",
+                            options=["long", "short", "both"],
+                            index=2,
+                            format_func=_DIRECTION_LABELS.__getitem__,
+                            key="rsi_strategy_trade_direction"
                         )
-                        
-                        ma_period_rsi = st.slider(
-                            "MA období",
-                            min_value=10,
-                            max_value=200,
-                            value=200,
-                            step=5,
-                            key="rsi_strategy_ma_period"
+                
+                    with col2:
+                        use_ma_filter_rsi = st.checkbox(
+                            "Použít MA filtr",
+                            value=False,
+                            key="rsi_strategy_use_ma_filter"
                         )
                     
-                    use_atr_for_sl_rsi = st.checkbox(
-                        "Použít ATR pro stop-loss",
-                        value=True,
-                        key="rsi_strategy_use_atr_for_sl"
-                    )
+                        if use_ma_filter_rsi:
+                            ma_type_rsi = st.selectbox(
+                                "Typ klouzavého průměru",
+                                options=["SMA", "EMA"],
+                                index=0,
+                                key="rsi_strategy_ma_type"
+                            )
+                        
+                            ma_period_rsi = st.slider(
+                                "MA období",
+                                min_value=10,
+                                max_value=200,
+                                value=200,
+                                step=5,
+                                key="rsi_strategy_ma_period"
+                            )
                     
-                    if use_atr_for_sl_rsi:
-                        atr_period_rsi = st.slider(
-                            "ATR období",
-                            min_value=5,
-                            max_value=30,
-                            value=14,
-                            step=1,
-                            key="rsi_strategy_atr_period"
+                        use_atr_for_sl_rsi = st.checkbox(
+                            "Použít ATR pro stop-loss",
+                            value=True,
+                            key="rsi_strategy_use_atr_for_sl"
                         )
+                    
+                        if use_atr_for_sl_rsi:
+                            atr_period_rsi = st.slider(
+                                "ATR období",
+                                min_value=5,
+                                max_value=30,
+                                value=14,
+                                step=1,
+                                key="rsi_strategy_atr_period"
+                            )
                         
-                        atr_multiplier_rsi = st.slider(
-                            "ATR násobič",
-                            min_value=0.5,
-                            max_value=3.0,
-                            value=1.5,
-                            step=0.1,
-                            key="rsi_strategy_atr_multiplier"
+                            atr_multiplier_rsi = st.slider(
+                                "ATR násobič",
+                                min_value=0.5,
+                                max_value=3.0,
+                                value=1.5,
+                                step=0.1,
+                                key="rsi_strategy_atr_multiplier"
+                            )
+                        else:
+                            stop_loss_pips_rsi = st.slider(
+                                "Stop-loss (% od vstupní ceny)",
+                                min_value=0.1,
+                                max_value=2.0,
+                                value=0.5,
+                                step=0.1,
+                                key="rsi_strategy_stop_loss_pips"
+                            )
+                    
+                        take_profit_pips_rsi = st.text_input(
+                            "Take-profit úrovně (% od vstupní ceny, oddělené čárkou)",
+                            value="1.25, 2.0, 3.0",
+                            key="rsi_strategy_take_profit_pips"
                         )
-                    else:
-                        stop_loss_pips_rsi = st.slider(
-                            "Stop-loss (% od vstupní ceny)",
-                            min_value=0.1,
-                            max_value=2.0,
-                            value=0.5,
+                    
+                        risk_reward_ratio_rsi = st.slider(
+                            "Minimální poměr rizika k zisku",
+                            min_value=1.0,
+                            max_value=5.0,
+                            value=2.5,
                             step=0.1,
-                            key="rsi_strategy_stop_loss_pips"
+                            key="rsi_strategy_risk_reward_ratio"
                         )
                     
-                    take_profit_pips_rsi = st.text_input(
-                        "Take-profit úrovně (% od vstupní ceny, oddělené čárkou)",
-                        value="1.25, 2.0, 3.0",
-                        key="rsi_strategy_take_profit_pips"
-                    )
-                    
-                    risk_reward_ratio_rsi = st.slider(
-                        "Minimální poměr rizika k zisku",
-                        min_value=1.0,
-                        max_value=5.0,
-                        value=2.5,
-                        step=0.1,
-                        key="rsi_strategy_risk_reward_ratio"
-                    )
-                    
-                    wait_for_exit = st.checkbox(
-                        "Čekat na výstup před novým vstupem",
-                        value=True,
-                        key="rsi_strategy_wait_for_exit"
-                    )
+                        wait_for_exit = st.checkbox(
+                            "Čekat na výstup před novým vstupem",
+                            value=True,
+                            key="rsi_strategy_wait_for_exit"
+                        )
             
-            # Tlačítko pro spuštění backtestu
-            if st.button("Spustit backtest"):
+                # Tlačítko pro spuštění backtestu
+                submitted = st.form_submit_button("Spustit backtest")
+
+            if submitted:
                 with st.spinner("Probíhá backtest..."):
-                    backtest_results = []
+                    # Úlohy nejdřív jen posbíráme a spustíme je souběžně níže
+                    backtest_jobs = []
                     
                     # Moving Average Crossover
                     if use_ma_crossover:
-                        # Parsování parametrů
+                        # Parse take-profit úrovně (memoizované podle řetězce)
+                        try:
+                            ma_take_profits = list(_parse_take_profits(take_profit_pips))
+                        except:
+                            st.warning("Neplatný formát take-profit úrovní. Použity výchozí hodnoty.")
+                            ma_take_profits = None
+                        
+                        # Parametry jedním slovníkovým literálem s podmíněnými
+                        # bloky místo řetězení .update()
                         ma_crossover_params = {
                             "fast_ma_period": int(fast_ma_period),
                             "slow_ma_period": int(slow_ma_period),
@@ -387,46 +559,36 @@ def strategy_comparison_app():
                             "trade_direction": trade_direction,
                             "risk_reward_ratio": float(risk_reward_ratio),
                             "use_atr_for_sl": use_atr_for_sl,
-                        }
-                        
-                        if use_atr_for_sl:
-                            ma_crossover_params.update({
-                                "atr_period": int(atr_period),
-                                "atr_multiplier": float(atr_multiplier)
-                            })
-                        else:
-                            ma_crossover_params.update({
-                                "stop_loss_pips": float(stop_loss_pips)
-                            })
-                        
-                        # Parse take-profit úrovně
-                        try:
-                            take_profit_list = [float(x.strip()) for x in take_profit_pips.split(",")]
-                            ma_crossover_params["take_profit_pips"] = take_profit_list
-                        except:
-                            st.warning("Neplatný formát take-profit úrovní. Použity výchozí hodnoty.")
-                        
-                        if use_rsi_filter:
-                            ma_crossover_params.update({
-                                "use_rsi_filter": True,
+                            **({"atr_period": int(atr_period),
+                                "atr_multiplier": float(atr_multiplier)}
+                               if use_atr_for_sl else
+                               {"stop_loss_pips": float(stop_loss_pips)}),
+                            **({"take_profit_pips": ma_take_profits}
+                               if ma_take_profits is not None else {}),
+                            **({"use_rsi_filter": True,
                                 "rsi_period": int(rsi_period),
                                 "rsi_overbought": int(rsi_overbought),
-                                "rsi_oversold": int(rsi_oversold)
-                            })
-                        
-                        # Vytvoření strategie
-                        ma_strategy = MovingAverageCrossover(
-                            name=f"MA Crossover ({ma_type} {fast_ma_period}/{slow_ma_period})",
-                            parameters=ma_crossover_params
-                        )
+                                "rsi_oversold": int(rsi_oversold)}
+                               if use_rsi_filter else {}),
+                        }
                         
-                        # Spuštění backtestu
-                        ma_results = ma_strategy.backtest(st.session_state.historical_data)
-                        backtest_results.append(ma_results)
+                        backtest_jobs.append((
+                            "MovingAverageCrossover",
+                            f"MA Crossover ({ma_type} {fast_ma_period}/{slow_ma_period})",
+                            _hashable_params(ma_crossover_params)
+                        ))
                     
                     # RSI Strategy
                     if use_rsi_strategy:
-                        # Parsování parametrů
+                        # Parse take-profit úrovně (memoizované podle řetězce)
+                        try:
+                            rsi_take_profits = list(_parse_take_profits(take_profit_pips_rsi))
+                        except:
+                            st.warning("Neplatný formát take-profit úrovní. Použity výchozí hodnoty.")
+                            rsi_take_profits = None
+                        
+                        # Parametry jedním slovníkovým literálem s podmíněnými
+                        # bloky místo řetězení .update()
                         rsi_strategy_params = {
                             "rsi_period": int(rsi_period_strategy),
                             "rsi_overbought": int(rsi_overbought_strategy),
@@ -435,50 +597,61 @@ def strategy_comparison_app():
                             "trade_direction": trade_direction_rsi,
                             "risk_reward_ratio": float(risk_reward_ratio_rsi),
                             "use_atr_for_sl": use_atr_for_sl_rsi,
-                            "wait_for_exit_before_new_entry": wait_for_exit
-                        }
-                        
-                        if use_atr_for_sl_rsi:
-                            rsi_strategy_params.update({
-                                "atr_period": int(atr_period_rsi),
-                                "atr_multiplier": float(atr_multiplier_rsi)
-                            })
-                        else:
-                            rsi_strategy_params.update({
-                                "stop_loss_pips": float(stop_loss_pips_rsi)
-                            })
-                        
-                        # Parse take-profit úrovně
-                        try:
-                            take_profit_list = [float(x.strip()) for x in take_profit_pips_rsi.split(",")]
-                            rsi_strategy_params["take_profit_pips"] = take_profit_list
-                        except:
-                            st.warning("Neplatný formát take-profit úrovní. Použity výchozí hodnoty.")
-                        
-                        if use_ma_filter_rsi:
-                            rsi_strategy_params.update({
-                                "use_ma_filter": True,
+                            "wait_for_exit_before_new_entry": wait_for_exit,
+                            **({"atr_period": int(atr_period_rsi),
+                                "atr_multiplier": float(atr_multiplier_rsi)}
+                               if use_atr_for_sl_rsi else
+                               {"stop_loss_pips": float(stop_loss_pips_rsi)}),
+                            **({"take_profit_pips": rsi_take_profits}
+                               if rsi_take_profits is not None else {}),
+                            **({"use_ma_filter": True,
                                 "ma_period": int(ma_period_rsi),
-                                "ma_type": ma_type_rsi.lower()
-                            })
-                        
-                        # Vytvoření strategie
-                        rsi_strategy = RSIStrategy(
-                            name=f"RSI Strategy (RSI {rsi_period_strategy})",
-                            parameters=rsi_strategy_params
-                        )
+                                "ma_type": ma_type_rsi.lower()}
+                               if use_ma_filter_rsi else {}),
+                        }
                         
-                        # Spuštění backtestu
-                        rsi_results = rsi_strategy.backtest(st.session_state.historical_data)
-                        backtest_results.append(rsi_results)
+                        backtest_jobs.append((
+                            "RSIStrategy",
+                            f"RSI Strategy (RSI {rsi_period_strategy})",
+                            _hashable_params(rsi_strategy_params)
+                        ))
+                    
+                    # Backtesty jsou nezávislé a pandas/numpy operace
+                    # uvolňují GIL - spustíme je souběžně; pořadí výsledků
+                    # drží pořadí úloh
+                    with ThreadPoolExecutor(max_workers=2) as executor:
+                        futures = [
+                            executor.submit(_run_backtest, cls_name, name,
+                                            params,
+                                            st.session_state.historical_data)
+                            for cls_name, name, params in backtest_jobs
+                        ]
+                        backtest_results = [future.result() for future in futures]
                     
-                    # Uložení výsledků
+                    # Sloupcová pole pro vykreslování spočítáme hned po
+                    # backtestu - reruny záložky výsledků už nad objekty
+                    # Trade neiterují
+                    for result in backtest_results:
+                        result["_soa"] = _closed_trades_soa(result["trades"])
+                    
+                    # Uložení výsledků + index podle jména pro O(1) výběr
+                    # v záložce výsledků
                     st.session_state.backtest_results = backtest_results
+                    st.session_state.backtest_results_by_name = {
+                        result["strategy_name"]: result
+                        for result in backtest_results
+                    }
                     
                     st.success("Backtest dokončen!")
-        
-        # Záložka s výsledky backtestu
-        with tabs[2]:
+
+                    # Fragmentový rerun by překreslil jen tuhle záložku -
+                    # vynutíme celoaplikační, aby záložky výsledků a
+                    # porovnání viděly nové výsledky hned po doběhnutí
+                    st.rerun(scope="app")
+
+        # Záložka s výsledky backtestu - fragment omezuje rerun jen na tuto záložku
+        @st.fragment
+        def _results_tab():
             if st.session_state.backtest_results:
                 st.header("Výsledky backtestu")
                 
@@ -486,9 +659,10 @@ def strategy_comparison_app():
                 strategy_names = [result["strategy_name"] for result in st.session_state.backtest_results]
                 selected_strategy = st.selectbox("Vyberte strategii", options=strategy_names)
                 
-                # Získání výsledků zvolené strategie
-                selected_result = next((result for result in st.session_state.backtest_results 
-                                       if result["strategy_name"] == selected_strategy), None)
+                # Získání výsledků zvolené strategie - slovníkový lookup
+                # místo lineárního průchodu při každém rerunu
+                selected_result = st.session_state.get(
+                    "backtest_results_by_name", {}).get(selected_strategy)
                 
                 if selected_result:
                     # Základní metriky
@@ -517,16 +691,15 @@ def strategy_comparison_app():
                     trades = selected_result["trades"]
                     
                     if trades:
-                        # Seřazení obchodů podle času ukončení
-                        closed_trades = [t for t in trades if t.status != TradeStatus.OPEN and t.exit_time is not None]
+                        # Hotová sloupcová pole z backtestu; fallback pro
+                        # výsledky uložené starší verzí session state
+                        soa = selected_result.get("_soa")
+                        if soa is None:
+                            soa = _closed_trades_soa(trades)
                         
-                        if closed_trades:
-                            sorted_trades = sorted(closed_trades, key=lambda t: t.exit_time)
-                            
-                            # Příprava dat
-                            dates = [t.exit_time for t in sorted_trades]
-                            profits = [t.profit_percentage for t in sorted_trades]
-                            cumulative_profits = np.cumsum(profits)
+                        if soa["exit_time"].size:
+                            dates = soa["exit_time"]
+                            cumulative_profits = soa["profit_pct"].cumsum()
                             
                             # Vytvoření grafu
                             fig = go.Figure()
@@ -540,19 +713,18 @@ def strategy_comparison_app():
                                 line=dict(color='blue', width=2)
                             ))
                             
-                            # Přidání jednotlivých obchodů
-                            for i, trade in enumerate(sorted_trades):
-                                color = 'green' if trade.status == TradeStatus.CLOSED_PROFIT else 'red'
-                                fig.add_trace(go.Scatter(
-                                    x=[trade.exit_time],
-                                    y=[cumulative_profits[i]],
-                                    mode='markers',
-                                    marker=dict(color=color, size=8),
-                                    name=f"Obchod {i+1}",
-                                    showlegend=False,
-                                    hoverinfo='text',
-                                    hovertext=f"Obchod {i+1}<br>Typ: {trade.trade_type.value}<br>Vstup: {trade.entry_price:.2f}<br>Výstup: {trade.exit_price:.2f}<br>Zisk/Ztráta: {trade.profit_percentage:.2f}%<br>Důvod: {trade.exit_reason}"
-                                ))
+                            # Všechny obchody v jediné markers stopě -
+                            # figura má 2 stopy místo N+1 a JSON neroste
+                            # lineárně s počtem obchodů
+                            fig.add_trace(go.Scatter(
+                                x=dates,
+                                y=cumulative_profits,
+                                mode='markers',
+                                marker=dict(color=soa["color"], size=8),
+                                showlegend=False,
+                                hoverinfo='text',
+                                hovertext=soa["hovertext"]
+                            ))
                             
                             # Nastavení grafu
                             fig.update_layout(
@@ -569,57 +741,55 @@ def strategy_comparison_app():
                         if trades:
                             st.subheader("Seznam obchodů")
                             
-                            # Připravíme data pro tabulku
-                            trade_data = []
-                            for i, trade in enumerate(trades):
-                                trade_data.append({
-                                    "Č.": i + 1,
-                                    "Typ": trade.trade_type.value,
-                                    "Vstup. cena": f"{trade.entry_price:.2f}",
-                                    "Stop-Loss": f"{trade.stop_loss:.2f}",
-                                    "Výstup. cena": f"{trade.exit_price:.2f}" if trade.exit_price is not None else "N/A",
-                                    "Zisk/Ztráta (%)": f"{trade.profit_percentage:.2f}%" if trade.profit_percentage is not None else "N/A",
-                                    "Stav": trade.status.value,
-                                    "Důvod výstupu": trade.exit_reason if trade.exit_reason is not None else "N/A"
-                                })
-                            
-                            trade_df = pd.DataFrame(trade_data)
+                            # Tabulku stavíme po sloupcích - pandas dostane
+                            # hotová pole místo seznamu řádkových slovníků
+                            # s inferencí dtype řádek po řádku
+                            trade_df = pd.DataFrame({
+                                "Č.": np.arange(1, len(trades) + 1),
+                                "Typ": [t.trade_type.value for t in trades],
+                                "Vstup. cena": [f"{t.entry_price:.2f}" for t in trades],
+                                "Stop-Loss": [f"{t.stop_loss:.2f}" for t in trades],
+                                "Výstup. cena": [f"{t.exit_price:.2f}" if t.exit_price is not None else "N/A" for t in trades],
+                                "Zisk/Ztráta (%)": [f"{t.profit_percentage:.2f}%" if t.profit_percentage is not None else "N/A" for t in trades],
+                                "Stav": [t.status.value for t in trades],
+                                "Důvod výstupu": [t.exit_reason if t.exit_reason is not None else "N/A" for t in trades],
+                            })
                             st.dataframe(trade_df, use_container_width=True)
                     else:
                         st.info("Žádné obchody nebyly generovány.")
             else:
                 st.info("Nejsou k dispozici žádné výsledky backtestu. Spusťte backtest v záložce 'Nastavení strategií'.")
-        
-        # Záložka s porovnáním strategií
-        with tabs[3]:
+
+        # Záložka s porovnáním strategií - fragment omezuje rerun jen na tuto záložku
+        @st.fragment
+        def _comparison_tab():
             if st.session_state.backtest_results and len(st.session_state.backtest_results) > 1:
                 st.header("Porovnání strategií")
                 
-                # Vytvoření porovnávacího grafu
-                comparison_fig = plot_strategy_comparison(st.session_state.backtest_results)
+                # Graf i tabulka se pro nezměněnou sadu výsledků vrací
+                # z cache - klíč tvoří jména strategií a jejich metriky
+                results_key = tuple(
+                    (r["strategy_name"], tuple(sorted(r["metrics"].items())))
+                    for r in st.session_state.backtest_results)
+                comparison_fig, comparison_df = _build_comparison(
+                    results_key, st.session_state.backtest_results)
+                
                 st.plotly_chart(comparison_fig, use_container_width=True)
                 
                 # Tabulka s metrikami pro porovnání
                 st.subheader("Porovnání metrik výkonnosti")
-                
-                comparison_data = []
-                for result in st.session_state.backtest_results:
-                    comparison_data.append({
-                        "Strategie": result["strategy_name"],
-                        "Celkový zisk/ztráta (%)": f"{result['metrics']['total_profit']:.2f}%",
-                        "Win Rate (%)": f"{result['metrics']['win_rate']*100:.2f}%",
-                        "Počet obchodů": result['metrics']['total_trades'],
-                        "Ziskové obchody": result['metrics']['winning_trades'],
-                        "Ztrátové obchody": result['metrics']['losing_trades'],
-                        "Profit Factor": f"{result['metrics']['profit_factor']:.2f}",
-                        "Max. Drawdown (%)": f"{result['metrics']['max_drawdown']:.2f}%",
-                        "Očekávaná hodnota (%)": f"{result['metrics']['expectancy']:.4f}%"
-                    })
-                
-                comparison_df = pd.DataFrame(comparison_data)
                 st.dataframe(comparison_df, use_container_width=True)
             else:
                 st.info("Pro porovnání strategií musíte spustit backtest alespoň pro dvě strategie.")
+
+        with tabs[0]:
+            _data_tab()
+        with tabs[1]:
+            _settings_tab()
+        with tabs[2]:
+            _results_tab()
+        with tabs[3]:
+            _comparison_tab()
     else:
         st.info("Nejprve načtěte historická data pomocí tlačítka 'Načíst historická data' v postranním panelu.")
 
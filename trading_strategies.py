@@ -1,5 +1,8 @@
+import itertools
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 # import matplotlib.pyplot as plt  # Není potřeba, používáme Plotly
@@ -19,7 +22,7 @@ class TradeStatus(Enum):
     CLOSED_LOSS = "UZAVŘENÝ (ZTRÁTA)"  # Uzavřený obchod se ztrátou
     CLOSED_EVEN = "UZAVŘENÝ (BREAK-EVEN)"  # Uzavřený obchod na nule
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
     """Reprezentace jednoho obchodu."""
     symbol: str  # Symbol instrumentu
@@ -110,6 +113,118 @@ class Trade:
         return False  # Žádná podmínka pro ukončení nebyla splněna
 
 
+def _wilder_rsi(close: pd.Series, period: int) -> pd.Series:
+    """
+    Spočítá RSI s Wilderovým exponenciálním vyhlazením zisků a ztrát.
+
+    Na rozdíl od prostého klouzavého průměru odpovídá standardní definici
+    RSI a počítá se jedním průchodem přes data.
+
+    Args:
+        close: Řada zavíracích cen
+        period: Období RSI
+
+    Returns:
+        Řada hodnot RSI
+    """
+    delta = close.diff().to_numpy()
+    gain = np.maximum(delta, 0.0)
+    loss = np.maximum(-delta, 0.0)
+    # where() nahrazovalo NaN (první bar) nulou - zachováme stejné chování
+    nan_mask = np.isnan(delta)
+    gain[nan_mask] = 0.0
+    loss[nan_mask] = 0.0
+    avg_gain = pd.Series(gain, index=close.index).ewm(alpha=1 / period, adjust=False).mean()
+    avg_loss = pd.Series(loss, index=close.index).ewm(alpha=1 / period, adjust=False).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def _backtest_single(strategy_cls: type, parameters: Dict[str, Any],
+                     df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Spustí jeden backtest v pracovním procesu (pomocná funkce pro backtest_grid).
+
+    Args:
+        strategy_cls: Třída strategie
+        parameters: Parametry strategie
+        df: DataFrame s historickými daty
+
+    Returns:
+        Výsledky backtestu
+    """
+    return strategy_cls(parameters=parameters).backtest(df)
+
+
+def _wilder_atr(df: pd.DataFrame, period: int) -> pd.Series:
+    """
+    Spočítá ATR (Average True Range) s Wilderovým exponenciálním vyhlazením.
+
+    True range se počítá přes np.maximum.reduce nad třemi 1-D poli, bez
+    alokace pomocného DataFramu.
+
+    Args:
+        df: DataFrame s OHLC daty
+        period: Období ATR
+
+    Returns:
+        Řada hodnot ATR
+    """
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    close = df['close'].to_numpy()
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    return pd.Series(tr, index=df.index).ewm(alpha=1 / period, adjust=False).mean()
+
+
+def _scan_exit(highs: np.ndarray, lows: np.ndarray, start: int,
+               stop_loss: float, take_profits: List[float],
+               is_buy: bool) -> Tuple[int, float, Optional[str]]:
+    """
+    Najde první bar od indexu start, který zasáhne stop-loss nebo některou
+    take-profit úroveň. Zásahy se vyhodnocují vektorizovaně nad celými poli
+    high/low a první bar se najde přes argmax.
+
+    Args:
+        highs: Pole high cen
+        lows: Pole low cen
+        start: Index prvního baru, od kterého se výstup hledá
+        stop_loss: Úroveň stop-loss
+        take_profits: Take-profit úrovně v pořadí priority
+        is_buy: True pro dlouhou pozici, False pro krátkou
+
+    Returns:
+        Trojice (index baru výstupu, výstupní cena, důvod výstupu);
+        (-1, 0.0, None) pokud do konce dat žádná úroveň nebyla zasažena
+    """
+    if start >= len(highs):
+        return -1, 0.0, None
+    
+    # Vektorizované vyhledání prvního zásahu: masky zásahů pro celý zbytek
+    # dat a argmax místo skalární smyčky bar po baru
+    if is_buy:
+        sl_hit = lows[start:] <= stop_loss
+        tp_hit = highs[start:] >= min(take_profits)
+    else:
+        sl_hit = highs[start:] >= stop_loss
+        tp_hit = lows[start:] <= max(take_profits)
+    
+    any_hit = sl_hit | tp_hit
+    offset = int(np.argmax(any_hit))
+    if not any_hit[offset]:
+        return -1, 0.0, None
+    
+    j = start + offset
+    # Stop-loss má přednost před take-profit úrovněmi v rámci jednoho baru
+    if sl_hit[offset]:
+        return j, stop_loss, "Stop-Loss"
+    for k, tp_level in enumerate(take_profits):
+        if (highs[j] >= tp_level) if is_buy else (lows[j] <= tp_level):
+            return j, tp_level, f"Take-Profit {k+1}"
+    return -1, 0.0, None
+
+
 class TradingStrategy:
     """Základní třída pro obchodní strategie."""
     
@@ -124,6 +239,7 @@ class TradingStrategy:
         self.name = name
         self.parameters = parameters or {}
         self.trades: List[Trade] = []
+        self.pruned = False  # Byl backtest předčasně ukončen kvůli drawdownu?
         
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -149,6 +265,7 @@ class TradingStrategy:
         """
         # Resetování obchodů
         self.trades = []
+        self.pruned = False
         
         # Generování signálů
         signals_df = self.generate_signals(df)
@@ -163,7 +280,8 @@ class TradingStrategy:
             "strategy_name": self.name,
             "parameters": self.parameters,
             "metrics": metrics,
-            "trades": self.trades
+            "trades": self.trades,
+            "pruned": self.pruned
         }
         
     def _simulate_trades(self, df: pd.DataFrame) -> None:
@@ -175,6 +293,96 @@ class TradingStrategy:
         """
         raise NotImplementedError("Tuto metodu musí implementovat potomci.")
         
+    @classmethod
+    def backtest_grid(cls, df: pd.DataFrame, param_grid: Dict[str, List[Any]],
+                      max_workers: Optional[int] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Spustí backtesty pro všechny kombinace parametrů z mřížky paralelně.
+
+        Kombinace se rozdělí mezi pracovní procesy, takže prohledávání
+        parametrů škáluje s počtem jader.
+
+        Args:
+            df: DataFrame s historickými daty (OHLCV)
+            param_grid: Slovník {název parametru: seznam hodnot}
+            max_workers: Počet pracovních procesů (výchozí je počet jader)
+
+        Returns:
+            Seznam dvojic (parametry, výsledky backtestu) ve stejném pořadí,
+            v jakém kombinace generuje itertools.product
+        """
+        keys = list(param_grid)
+        combos = [dict(zip(keys, values))
+                  for values in itertools.product(*(param_grid[key] for key in keys))]
+        if not combos:
+            return []
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(combos))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_backtest_single, cls, params, df)
+                       for params in combos]
+            return [(params, future.result())
+                    for params, future in zip(combos, futures)]
+        
+    def _close_trade_from_scan(self, symbol: str, trade_type: TradeType,
+                               signal_index: int, entry_price: float,
+                               stop_loss: float, take_profit: List[float],
+                               closes: np.ndarray, highs: np.ndarray,
+                               lows: np.ndarray, times) -> Trade:
+        """
+        Vytvoří obchod a uzavře ho podle prvního zásahu SL/TP za signálem.
+
+        Pokud do konce dat žádná úroveň zasažena není, obchod se uzavře na
+        poslední ceně s důvodem "Konec backtestu".
+
+        Args:
+            symbol: Symbol instrumentu
+            trade_type: Směr obchodu
+            signal_index: Index baru se signálem
+            entry_price: Vstupní cena
+            stop_loss: Úroveň stop-loss
+            take_profit: Take-profit úrovně
+            closes, highs, lows: NumPy pole cen
+            times: Index časových razítek
+
+        Returns:
+            Uzavřený obchod
+        """
+        trade = Trade(
+            symbol=symbol,
+            trade_type=trade_type,
+            entry_price=entry_price,
+            entry_time=times[signal_index],
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            status=TradeStatus.OPEN
+        )
+        
+        exit_idx, exit_price, exit_reason = _scan_exit(
+            highs, lows, signal_index + 1, stop_loss, take_profit,
+            trade_type is TradeType.BUY)
+        
+        if exit_idx >= 0:
+            trade.exit_price = exit_price
+            trade.exit_time = times[exit_idx]
+            trade.status = (TradeStatus.CLOSED_LOSS if exit_reason == "Stop-Loss"
+                            else TradeStatus.CLOSED_PROFIT)
+            trade.exit_reason = exit_reason
+        else:
+            # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
+            trade.exit_price = closes[-1]
+            trade.exit_time = times[-1]
+            if trade_type is TradeType.BUY:
+                profitable = trade.exit_price > entry_price
+            else:
+                profitable = trade.exit_price < entry_price
+            trade.status = (TradeStatus.CLOSED_PROFIT if profitable
+                            else TradeStatus.CLOSED_LOSS)
+            trade.exit_reason = "Konec backtestu"
+        
+        trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
+        return trade
+        
     def _calculate_performance_metrics(self) -> Dict[str, Any]:
         """
         Vypočítá metriky výkonnosti strategie.
@@ -217,25 +425,25 @@ class TradingStrategy:
                 "total_profit": 0.0
             }
             
-        # Ziskové obchody
-        winning_trades = [t for t in closed_trades if t.status == TradeStatus.CLOSED_PROFIT]
-        winning_count = len(winning_trades)
-        
-        # Ztrátové obchody
-        losing_trades = [t for t in closed_trades if t.status == TradeStatus.CLOSED_LOSS]
-        losing_count = len(losing_trades)
+        # Jednorázová extrakce zisků a stavů do polí - všechny metriky se pak
+        # počítají redukcemi nad nimi místo opakovaných list comprehensions
+        profits = np.fromiter((t.profit_percentage for t in closed_trades),
+                              dtype=float, count=closed_count)
+        win_mask = np.fromiter((t.status == TradeStatus.CLOSED_PROFIT for t in closed_trades),
+                               dtype=bool, count=closed_count)
+        loss_mask = np.fromiter((t.status == TradeStatus.CLOSED_LOSS for t in closed_trades),
+                                dtype=bool, count=closed_count)
+        
+        winning_count = int(win_mask.sum())
+        losing_count = int(loss_mask.sum())
         
         # Win rate
         win_rate = winning_count / closed_count if closed_count > 0 else 0.0
         
-        # Celkový zisk/ztráta
-        total_profit = sum(t.profit_percentage for t in closed_trades) if closed_trades else 0.0
-        
-        # Hrubý zisk
-        gross_profit = sum(t.profit_percentage for t in winning_trades) if winning_trades else 0.0
-        
-        # Hrubá ztráta
-        gross_loss = abs(sum(t.profit_percentage for t in losing_trades)) if losing_trades else 0.0
+        # Celkový zisk/ztráta, hrubý zisk a hrubá ztráta
+        total_profit = float(profits.sum())
+        gross_profit = float(profits[win_mask].sum())
+        gross_loss = abs(float(profits[loss_mask].sum()))
         
         # Profit factor
         profit_factor = gross_profit / gross_loss if gross_loss > 0 else float('inf') if gross_profit > 0 else 0.0
@@ -251,23 +459,11 @@ class TradingStrategy:
         
         # Maximum drawdown (zjednodušená implementace)
         # Pro přesnější výpočet by bylo třeba sledovat equity průběžně v čase
-        max_drawdown = 0.0
-        if closed_trades:
-            equity_curve = []
-            running_balance = 0.0
-            
-            for trade in sorted(closed_trades, key=lambda t: t.entry_time):
-                if trade.profit_percentage is not None:
-                    running_balance += trade.profit_percentage
-                    equity_curve.append(running_balance)
-            
-            if equity_curve:
-                peak = 0.0
-                for balance in equity_curve:
-                    if balance > peak:
-                        peak = balance
-                    drawdown = peak - balance
-                    max_drawdown = max(max_drawdown, drawdown)
+        # Obchody vznikají při průchodu bary dopředu, takže self.trades je už
+        # seřazený podle času vstupu a není potřeba znovu řadit
+        equity = np.cumsum(profits)
+        peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+        max_drawdown = float(np.max(peak - equity))
         
         return {
             "total_trades": total_trades,
@@ -321,19 +517,24 @@ class TradingStrategy:
             line=dict(color='blue', width=2)
         ))
         
-        # Přidání jednotlivých obchodů
-        for i, trade in enumerate(sorted_trades):
-            color = 'green' if trade.status == TradeStatus.CLOSED_PROFIT else 'red'
-            fig.add_trace(go.Scatter(
-                x=[trade.exit_time],
-                y=[cumulative_profits[i]],
-                mode='markers',
-                marker=dict(color=color, size=8),
-                name=f"Obchod {i+1}",
-                showlegend=False,
-                hoverinfo='text',
-                hovertext=f"Obchod {i+1}<br>Typ: {trade.trade_type.value}<br>Vstup: {trade.entry_price:.2f}<br>Výstup: {trade.exit_price:.2f}<br>Zisk/Ztráta: {trade.profit_percentage:.2f}%<br>Důvod: {trade.exit_reason}"
-            ))
+        # Přidání jednotlivých obchodů - jedna trasa se všemi markery místo
+        # samostatné trasy pro každý obchod
+        colors = ['green' if trade.status == TradeStatus.CLOSED_PROFIT else 'red'
+                  for trade in sorted_trades]
+        hovertexts = [
+            f"Obchod {i+1}<br>Typ: {trade.trade_type.value}<br>Vstup: {trade.entry_price:.2f}<br>Výstup: {trade.exit_price:.2f}<br>Zisk/Ztráta: {trade.profit_percentage:.2f}%<br>Důvod: {trade.exit_reason}"
+            for i, trade in enumerate(sorted_trades)
+        ]
+        fig.add_trace(go.Scatter(
+            x=dates,
+            y=cumulative_profits,
+            mode='markers',
+            marker=dict(color=colors, size=8),
+            name="Obchody",
+            showlegend=False,
+            hoverinfo='text',
+            hovertext=hovertexts
+        ))
         
         # Nastavení grafu
         fig.update_layout(
@@ -369,6 +570,7 @@ class MovingAverageCrossover(TradingStrategy):
             "atr_multiplier": 1.5,  # Násobič ATR pro stop-loss
             "atr_period": 14,  # Období pro ATR
             "trade_direction": "both",  # Směr obchodování ('long', 'short', 'both')
+            "early_stop_drawdown": None,  # Ukončit backtest při překročení drawdownu (v %, None = vypnuto)
             "use_rsi_filter": False,  # Použít RSI filtr?
             "rsi_period": 14,  # Období pro RSI
             "rsi_overbought": 70,  # Hranice překoupenosti
@@ -390,100 +592,68 @@ class MovingAverageCrossover(TradingStrategy):
         Returns:
             DataFrame s přidanými sloupci pro signály
         """
-        # Kopie DataFramu
-        result = df.copy()
-        
         # Získání parametrů
         fast_period = self.parameters["fast_ma_period"]
         slow_period = self.parameters["slow_ma_period"]
         ma_type = self.parameters["ma_type"]
         
+        # Nové sloupce se skládají bokem a na konci připojí jedním concat,
+        # takže se původní OHLCV data nekopírují
+        close = df['close']
+        
         # Výpočet klouzavých průměrů
         if ma_type.lower() == "sma":
-            result[f'fast_ma'] = result['close'].rolling(window=fast_period).mean()
-            result[f'slow_ma'] = result['close'].rolling(window=slow_period).mean()
+            fast_ma = close.rolling(window=fast_period).mean()
+            slow_ma = close.rolling(window=slow_period).mean()
         elif ma_type.lower() == "ema":
-            result[f'fast_ma'] = result['close'].ewm(span=fast_period, adjust=False).mean()
-            result[f'slow_ma'] = result['close'].ewm(span=slow_period, adjust=False).mean()
+            fast_ma = close.ewm(span=fast_period, adjust=False).mean()
+            slow_ma = close.ewm(span=slow_period, adjust=False).mean()
         else:
             raise ValueError(f"Neznámý typ klouzavého průměru: {ma_type}")
         
+        new_cols = {'fast_ma': fast_ma, 'slow_ma': slow_ma}
+        
         # Výpočet RSI, pokud je potřeba
         if self.parameters["use_rsi_filter"]:
-            rsi_period = self.parameters["rsi_period"]
-            delta = result['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-            avg_gain = gain.rolling(window=rsi_period).mean()
-            avg_loss = loss.rolling(window=rsi_period).mean()
-            rs = avg_gain / avg_loss
-            result['rsi'] = 100 - (100 / (1 + rs))
+            new_cols['rsi'] = _wilder_rsi(close, self.parameters["rsi_period"])
         
         # Výpočet ATR, pokud je potřeba
         if self.parameters["use_atr_for_sl"]:
-            atr_period = self.parameters["atr_period"]
-            tr1 = result['high'] - result['low']
-            tr2 = abs(result['high'] - result['close'].shift())
-            tr3 = abs(result['low'] - result['close'].shift())
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            result['atr'] = tr.rolling(window=atr_period).mean()
-        
-        # Inicializace signálů
-        result['buy_signal'] = False
-        result['sell_signal'] = False
+            new_cols['atr'] = _wilder_atr(df, self.parameters["atr_period"])
         
         # Generování signálů na základě křížení klouzavých průměrů
+        # vektorizovaně přes posunutá porovnání - bez smyčky po barech
         # Buy signal: fast_ma křižuje slow_ma zespoda
         # Sell signal: fast_ma křižuje slow_ma shora
-        for i in range(1, len(result)):
-            # Předchozí stav: fast_ma < slow_ma
-            prev_fast_below_slow = result['fast_ma'].iloc[i-1] < result['slow_ma'].iloc[i-1]
-            
-            # Aktuální stav: fast_ma > slow_ma
-            curr_fast_above_slow = result['fast_ma'].iloc[i] > result['slow_ma'].iloc[i]
-            
-            # Buy signal
-            if prev_fast_below_slow and curr_fast_above_slow:
-                # Aplikace filtrů
-                if self._apply_filters(result, i, "buy"):
-                    result.loc[result.index[i], 'buy_signal'] = True
-            
-            # Sell signal
-            elif not prev_fast_below_slow and not curr_fast_above_slow:
-                # Aplikace filtrů
-                if self._apply_filters(result, i, "sell"):
-                    result.loc[result.index[i], 'sell_signal'] = True
+        fast = fast_ma.to_numpy()
+        slow = slow_ma.to_numpy()
         
-        return result
+        prev_fast_below_slow = fast[:-1] < slow[:-1]
+        curr_fast_above_slow = fast[1:] > slow[1:]
         
-    def _apply_filters(self, df: pd.DataFrame, index: int, signal_type: str) -> bool:
-        """
-        Aplikuje filtry na signál.
+        buy = np.zeros(len(df), dtype=bool)
+        sell = np.zeros(len(df), dtype=bool)
+        buy[1:] = prev_fast_below_slow & curr_fast_above_slow
+        sell[1:] = ~prev_fast_below_slow & ~curr_fast_above_slow
         
-        Args:
-            df: DataFrame s daty
-            index: Index aktuálního záznamu
-            signal_type: Typ signálu ('buy' nebo 'sell')
-            
-        Returns:
-            True, pokud signál prošel všemi filtry, jinak False
-        """
-        # Směr obchodování
+        # Filtr směru obchodování
         trade_direction = self.parameters["trade_direction"]
-        if trade_direction == "long" and signal_type == "sell":
-            return False
-        if trade_direction == "short" and signal_type == "buy":
-            return False
+        if trade_direction == "long":
+            sell[:] = False
+        elif trade_direction == "short":
+            buy[:] = False
         
-        # RSI filtr
+        # RSI filtr - negace porovnání zachovává chování NaN hodnot
+        # v zahřívací fázi indikátoru
         if self.parameters["use_rsi_filter"]:
-            rsi = df['rsi'].iloc[index]
-            if signal_type == "buy" and rsi >= self.parameters["rsi_overbought"]:
-                return False
-            if signal_type == "sell" and rsi <= self.parameters["rsi_oversold"]:
-                return False
+            rsi = new_cols['rsi'].to_numpy()
+            buy &= ~(rsi >= self.parameters["rsi_overbought"])
+            sell &= ~(rsi <= self.parameters["rsi_oversold"])
+        
+        new_cols['buy_signal'] = buy
+        new_cols['sell_signal'] = sell
         
-        return True
+        return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1, copy=False)
         
     def _simulate_trades(self, df: pd.DataFrame) -> None:
         """
@@ -492,100 +662,84 @@ class MovingAverageCrossover(TradingStrategy):
         Args:
             df: DataFrame se signály
         """
+        # Jednorázová extrakce do NumPy polí - hledání výstupu pak běží nad
+        # souvislými poli místo pandas .iloc přístupů po jednom baru
+        closes = df['close'].to_numpy()
+        highs = df['high'].to_numpy()
+        lows = df['low'].to_numpy()
+        times = df.index
+        buy_signals = df['buy_signal'].to_numpy()
+        sell_signals = df['sell_signal'].to_numpy()
+        
+        use_atr = self.parameters["use_atr_for_sl"]
+        min_rr_ratio = self.parameters["risk_reward_ratio"]
+        early_stop_dd = self.parameters.get("early_stop_drawdown")
+        
+        # Průběžná equity pro předčasné ukončení beznadějných kombinací
+        running_eq = 0.0
+        peak_eq = 0.0
+        
+        # Předpočítané SL/TP úrovně pro všechny bary najednou (broadcasting
+        # místo výpočtu po jednotlivých signálech)
+        if use_atr:
+            atr = df['atr'].to_numpy()
+            atr_multiplier = self.parameters["atr_multiplier"]
+            sl_buy = closes - atr * atr_multiplier
+            sl_sell = closes + atr * atr_multiplier
+        else:
+            stop_loss_pct = self.parameters["stop_loss_pips"]
+            sl_buy = closes * (1 - stop_loss_pct / 100)
+            sl_sell = closes * (1 + stop_loss_pct / 100)
+        tp_pct = np.asarray(self.parameters["take_profit_pips"], dtype=float) / 100
+        tp_buy = closes[:, None] * (1 + tp_pct)
+        tp_sell = closes[:, None] * (1 - tp_pct)
+        
+        symbol = df['symbol'].iloc[0] if 'symbol' in df.columns else "Unknown"
+        
         for i in range(len(df) - 1):  # -1, protože potřebujeme i+1 pro kontrolu uzavření
             # Buy signál
-            if df['buy_signal'].iloc[i]:
-                entry_price = df['close'].iloc[i]
-                entry_time = df.index[i]
-                
-                # Nastavení stop-loss
-                if self.parameters["use_atr_for_sl"]:
-                    stop_loss = entry_price - (df['atr'].iloc[i] * self.parameters["atr_multiplier"])
-                else:
-                    stop_loss = entry_price * (1 - self.parameters["stop_loss_pips"] / 100)
-                
-                # Nastavení take-profit úrovní
-                take_profit = [entry_price * (1 + tp_pips / 100) for tp_pips in self.parameters["take_profit_pips"]]
+            if buy_signals[i]:
+                entry_price = closes[i]
+                stop_loss = sl_buy[i]
+                take_profit = tp_buy[i].tolist()
                 
                 # Kontrola minimálního poměru rizika k zisku
                 risk = entry_price - stop_loss
                 reward = take_profit[0] - entry_price
                 rr_ratio = reward / risk if risk > 0 else 0
                 
-                if rr_ratio >= self.parameters["risk_reward_ratio"]:
-                    # Vytvoření obchodu
-                    trade = Trade(
-                        symbol=df.get('symbol', ['Unknown'])[0] if isinstance(df.get('symbol'), pd.Series) else "Unknown",
-                        trade_type=TradeType.BUY,
-                        entry_price=entry_price,
-                        entry_time=entry_time,
-                        stop_loss=stop_loss,
-                        take_profit=take_profit,
-                        status=TradeStatus.OPEN
-                    )
-                    
-                    # Simulace výsledku obchodu
-                    for j in range(i + 1, len(df)):
-                        if trade.check_exit_conditions(df['high'].iloc[j], df['low'].iloc[j], df.index[j]):
-                            break
-                    
-                    # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
-                    if trade.status == TradeStatus.OPEN:
-                        trade.exit_price = df['close'].iloc[-1]
-                        trade.exit_time = df.index[-1]
-                        trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price > trade.entry_price else TradeStatus.CLOSED_LOSS
-                        trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
-                        trade.exit_reason = "Konec backtestu"
-                    
-                    # Přidání obchodu do seznamu
+                if rr_ratio >= min_rr_ratio:
+                    trade = self._close_trade_from_scan(
+                        symbol, TradeType.BUY, i, entry_price, stop_loss,
+                        take_profit, closes, highs, lows, times)
                     self.trades.append(trade)
+                    running_eq += trade.profit_percentage
+                    peak_eq = max(peak_eq, running_eq)
+                    if early_stop_dd is not None and peak_eq - running_eq > early_stop_dd:
+                        self.pruned = True
+                        break
             
             # Sell signál
-            if df['sell_signal'].iloc[i]:
-                entry_price = df['close'].iloc[i]
-                entry_time = df.index[i]
-                
-                # Nastavení stop-loss
-                if self.parameters["use_atr_for_sl"]:
-                    stop_loss = entry_price + (df['atr'].iloc[i] * self.parameters["atr_multiplier"])
-                else:
-                    stop_loss = entry_price * (1 + self.parameters["stop_loss_pips"] / 100)
-                
-                # Nastavení take-profit úrovní
-                take_profit = [entry_price * (1 - tp_pips / 100) for tp_pips in self.parameters["take_profit_pips"]]
+            if sell_signals[i]:
+                entry_price = closes[i]
+                stop_loss = sl_sell[i]
+                take_profit = tp_sell[i].tolist()
                 
                 # Kontrola minimálního poměru rizika k zisku
                 risk = stop_loss - entry_price
                 reward = entry_price - take_profit[0]
                 rr_ratio = reward / risk if risk > 0 else 0
                 
-                if rr_ratio >= self.parameters["risk_reward_ratio"]:
-                    # Vytvoření obchodu
-                    trade = Trade(
-                        symbol=df.get('symbol', ['Unknown'])[0] if isinstance(df.get('symbol'), pd.Series) else "Unknown",
-                        trade_type=TradeType.SELL,
-                        entry_price=entry_price,
-                        entry_time=entry_time,
-                        stop_loss=stop_loss,
-                        take_profit=take_profit,
-                        status=TradeStatus.OPEN
-                    )
-                    
-                    # Simulace výsledku obchodu
-                    for j in range(i + 1, len(df)):
-                        if trade.check_exit_conditions(df['high'].iloc[j], df['low'].iloc[j], df.index[j]):
-                            break
-                    
-                    # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
-                    if trade.status == TradeStatus.OPEN:
-                        trade.exit_price = df['close'].iloc[-1]
-                        trade.exit_time = df.index[-1]
-                        trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price < trade.entry_price else TradeStatus.CLOSED_LOSS
-                        trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
-                        trade.exit_reason = "Konec backtestu"
-                    
-                    # Přidání obchodu do seznamu
+                if rr_ratio >= min_rr_ratio:
+                    trade = self._close_trade_from_scan(
+                        symbol, TradeType.SELL, i, entry_price, stop_loss,
+                        take_profit, closes, highs, lows, times)
                     self.trades.append(trade)
+                    running_eq += trade.profit_percentage
+                    peak_eq = max(peak_eq, running_eq)
+                    if early_stop_dd is not None and peak_eq - running_eq > early_stop_dd:
+                        self.pruned = True
+                        break
 
 
 class RSIStrategy(TradingStrategy):
@@ -614,6 +768,7 @@ class RSIStrategy(TradingStrategy):
             "atr_multiplier": 1.5,  # Násobič ATR pro stop-loss
             "atr_period": 14,  # Období pro ATR
             "trade_direction": "both",  # Směr obchodování ('long', 'short', 'both')
+            "early_stop_drawdown": None,  # Ukončit backtest při překročení drawdownu (v %, None = vypnuto)
             "wait_for_exit_before_new_entry": True  # Čekat na výstup před novým vstupem?
         }
         
@@ -632,18 +787,12 @@ class RSIStrategy(TradingStrategy):
         Returns:
             DataFrame s přidanými sloupci pro signály
         """
-        # Kopie DataFramu
-        result = df.copy()
+        # Nové sloupce se skládají bokem a na konci připojí jedním concat,
+        # takže se původní OHLCV data nekopírují
+        close = df['close']
         
         # Výpočet RSI
-        rsi_period = self.parameters["rsi_period"]
-        delta = result['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.rolling(window=rsi_period).mean()
-        avg_loss = loss.rolling(window=rsi_period).mean()
-        rs = avg_gain / avg_loss
-        result['rsi'] = 100 - (100 / (1 + rs))
+        new_cols = {'rsi': _wilder_rsi(close, self.parameters["rsi_period"])}
         
         # Výpočet klouzavého průměru, pokud je potřeba
         if self.parameters["use_ma_filter"]:
@@ -651,94 +800,56 @@ class RSIStrategy(TradingStrategy):
             ma_type = self.parameters["ma_type"]
             
             if ma_type.lower() == "sma":
-                result['ma'] = result['close'].rolling(window=ma_period).mean()
+                new_cols['ma'] = close.rolling(window=ma_period).mean()
             elif ma_type.lower() == "ema":
-                result['ma'] = result['close'].ewm(span=ma_period, adjust=False).mean()
+                new_cols['ma'] = close.ewm(span=ma_period, adjust=False).mean()
             else:
                 raise ValueError(f"Neznámý typ klouzavého průměru: {ma_type}")
         
         # Výpočet ATR, pokud je potřeba
         if self.parameters["use_atr_for_sl"]:
-            atr_period = self.parameters["atr_period"]
-            tr1 = result['high'] - result['low']
-            tr2 = abs(result['high'] - result['close'].shift())
-            tr3 = abs(result['low'] - result['close'].shift())
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            result['atr'] = tr.rolling(window=atr_period).mean()
-        
-        # Inicializace signálů
-        result['buy_signal'] = False
-        result['sell_signal'] = False
-        result['exit_long_signal'] = False
-        result['exit_short_signal'] = False
-        
-        # Generování signálů na základě RSI
-        for i in range(1, len(result)):
-            # RSI přechází z přeprodané oblasti
-            rsi_oversold_exit = (result['rsi'].iloc[i-1] <= self.parameters["rsi_oversold"] and 
-                            result['rsi'].iloc[i] > self.parameters["rsi_oversold"])
-            
-            # RSI přechází z překoupené oblasti
-            rsi_overbought_exit = (result['rsi'].iloc[i-1] >= self.parameters["rsi_overbought"] and 
-                                result['rsi'].iloc[i] < self.parameters["rsi_overbought"])
-            
-            # RSI přechází přes výstupní úroveň směrem nahoru
-            rsi_exit_up = (result['rsi'].iloc[i-1] < self.parameters["exit_rsi_level"] and 
-                        result['rsi'].iloc[i] >= self.parameters["exit_rsi_level"])
-            
-            # RSI přechází přes výstupní úroveň směrem dolů
-            rsi_exit_down = (result['rsi'].iloc[i-1] > self.parameters["exit_rsi_level"] and 
-                            result['rsi'].iloc[i] <= self.parameters["exit_rsi_level"])
-            
-            # Aplikace filtrů a generování signálů
-            # Buy signal: RSI opouští přeprodanou oblast
-            if rsi_oversold_exit and self._apply_filters(result, i, "buy"):
-                result.loc[result.index[i], 'buy_signal'] = True
-            
-            # Sell signal: RSI opouští překoupenou oblast
-            if rsi_overbought_exit and self._apply_filters(result, i, "sell"):
-                result.loc[result.index[i], 'sell_signal'] = True
-            
-            # Exit long signal: RSI klesá pod výstupní úroveň
-            if rsi_exit_down:
-                result.loc[result.index[i], 'exit_long_signal'] = True
-            
-            # Exit short signal: RSI stoupá nad výstupní úroveň
-            if rsi_exit_up:
-                result.loc[result.index[i], 'exit_short_signal'] = True
-        
-        return result
-        
-    def _apply_filters(self, df: pd.DataFrame, index: int, signal_type: str) -> bool:
-        """
-        Aplikuje filtry na signál.
-        
-        Args:
-            df: DataFrame s daty
-            index: Index aktuálního záznamu
-            signal_type: Typ signálu ('buy' nebo 'sell')
-            
-        Returns:
-            True, pokud signál prošel všemi filtry, jinak False
-        """
-        # Směr obchodování
+            new_cols['atr'] = _wilder_atr(df, self.parameters["atr_period"])
+        
+        # Generování signálů na základě RSI - vektorizovaně přes posunutá pole
+        # (NaN hodnoty v zahřívací periodě dávají False, stejně jako dřív)
+        rsi = new_cols['rsi'].to_numpy()
+        prev_rsi = np.roll(rsi, 1)
+        oversold = self.parameters["rsi_oversold"]
+        overbought = self.parameters["rsi_overbought"]
+        exit_level = self.parameters["exit_rsi_level"]
+        
+        # RSI přechází z přeprodané oblasti -> buy
+        buy = (prev_rsi <= oversold) & (rsi > oversold)
+        # RSI přechází z překoupené oblasti -> sell
+        sell = (prev_rsi >= overbought) & (rsi < overbought)
+        # RSI přechází přes výstupní úroveň směrem dolů -> exit long
+        exit_long = (prev_rsi > exit_level) & (rsi <= exit_level)
+        # RSI přechází přes výstupní úroveň směrem nahoru -> exit short
+        exit_short = (prev_rsi < exit_level) & (rsi >= exit_level)
+        
+        # První bar nemá předchozí hodnotu (np.roll ji bere z konce pole)
+        buy[0] = sell[0] = exit_long[0] = exit_short[0] = False
+        
+        # Filtr směru obchodování
         trade_direction = self.parameters["trade_direction"]
-        if trade_direction == "long" and signal_type == "sell":
-            return False
-        if trade_direction == "short" and signal_type == "buy":
-            return False
+        if trade_direction == "long":
+            sell[:] = False
+        elif trade_direction == "short":
+            buy[:] = False
         
-        # Filtr klouzavého průměru
+        # Filtr klouzavého průměru (negované podmínky kvůli NaN v zahřívací periodě)
         if self.parameters["use_ma_filter"]:
-            price = df['close'].iloc[index]
-            ma = df['ma'].iloc[index]
-            
-            if signal_type == "buy" and price < ma:
-                return False
-            if signal_type == "sell" and price > ma:
-                return False
+            close_arr = close.to_numpy()
+            ma = new_cols['ma'].to_numpy()
+            buy &= ~(close_arr < ma)
+            sell &= ~(close_arr > ma)
+        
+        new_cols['buy_signal'] = buy
+        new_cols['sell_signal'] = sell
+        new_cols['exit_long_signal'] = exit_long
+        new_cols['exit_short_signal'] = exit_short
         
-        return True
+        return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1, copy=False)
         
     def _simulate_trades(self, df: pd.DataFrame) -> None:
         """
@@ -751,40 +862,72 @@ class RSIStrategy(TradingStrategy):
         active_long = False
         active_short = False
         
+        # Předpočítané SL/TP úrovně pro všechny bary najednou (broadcasting
+        # místo výpočtu po jednotlivých signálech)
+        closes = df['close'].to_numpy()
+        highs = df['high'].to_numpy()
+        lows = df['low'].to_numpy()
+        times = df.index
+        buy_signals = df['buy_signal'].to_numpy()
+        sell_signals = df['sell_signal'].to_numpy()
+        exit_long_signals = df['exit_long_signal'].to_numpy()
+        exit_short_signals = df['exit_short_signal'].to_numpy()
+        # Pozice výstupních signálů pro vyhledání nejbližšího výstupu přes
+        # searchsorted místo argmax nad výřezem pole pro každý obchod
+        exit_long_positions = np.flatnonzero(exit_long_signals)
+        exit_short_positions = np.flatnonzero(exit_short_signals)
+        use_atr = self.parameters["use_atr_for_sl"]
+        if use_atr:
+            atr = df['atr'].to_numpy()
+            atr_multiplier = self.parameters["atr_multiplier"]
+            sl_buy = closes - atr * atr_multiplier
+            sl_sell = closes + atr * atr_multiplier
+        else:
+            stop_loss_pct = self.parameters["stop_loss_pips"]
+            sl_buy = closes * (1 - stop_loss_pct / 100)
+            sl_sell = closes * (1 + stop_loss_pct / 100)
+        tp_pct = np.asarray(self.parameters["take_profit_pips"], dtype=float) / 100
+        tp_buy = closes[:, None] * (1 + tp_pct)
+        tp_sell = closes[:, None] * (1 - tp_pct)
+        
+        symbol = df['symbol'].iloc[0] if 'symbol' in df.columns else "Unknown"
+        
+        # Parametry čtené v každé iteraci smyčky vytažené do lokálních proměnných
+        min_rr_ratio = self.parameters["risk_reward_ratio"]
+        wait_for_exit = self.parameters["wait_for_exit_before_new_entry"]
+        early_stop_dd = self.parameters.get("early_stop_drawdown")
+        
+        # Průběžná equity pro předčasné ukončení beznadějných kombinací
+        running_eq = 0.0
+        peak_eq = 0.0
+        
         for i in range(len(df) - 1):  # -1, protože potřebujeme i+1 pro kontrolu uzavření
             # Výstup z long pozice
-            if active_long and df['exit_long_signal'].iloc[i]:
+            if active_long and exit_long_signals[i]:
                 active_long = False
             
             # Výstup z short pozice
-            if active_short and df['exit_short_signal'].iloc[i]:
+            if active_short and exit_short_signals[i]:
                 active_short = False
             
             # Buy signál
-            if df['buy_signal'].iloc[i] and (not active_long or not self.parameters["wait_for_exit_before_new_entry"]):
-                entry_price = df['close'].iloc[i]
-                entry_time = df.index[i]
-                
-                # Nastavení stop-loss
-                if self.parameters["use_atr_for_sl"]:
-                    stop_loss = entry_price - (df['atr'].iloc[i] * self.parameters["atr_multiplier"])
-                else:
-                    stop_loss = entry_price * (1 - self.parameters["stop_loss_pips"] / 100)
-                
-                # Nastavení take-profit úrovní
-                take_profit = [entry_price * (1 + tp_pips / 100) for tp_pips in self.parameters["take_profit_pips"]]
+            if buy_signals[i] and (not active_long or not wait_for_exit):
+                entry_price = closes[i]
+                entry_time = times[i]
+                stop_loss = sl_buy[i]
+                take_profit = tp_buy[i].tolist()
                 
                 # Kontrola minimálního poměru rizika k zisku
                 risk = entry_price - stop_loss
                 reward = take_profit[0] - entry_price
                 rr_ratio = reward / risk if risk > 0 else 0
                 
-                if rr_ratio >= self.parameters["risk_reward_ratio"]:
+                if rr_ratio >= min_rr_ratio:
                     active_long = True
                     
                     # Vytvoření obchodu
                     trade = Trade(
-                        symbol=df.get('symbol', ['Unknown'])[0] if isinstance(df.get('symbol'), pd.Series) else "Unknown",
+                        symbol=symbol,
                         trade_type=TradeType.BUY,
                         entry_price=entry_price,
                         entry_time=entry_time,
@@ -793,60 +936,62 @@ class RSIStrategy(TradingStrategy):
                         status=TradeStatus.OPEN
                     )
                     
-                    # Simulace výsledku obchodu
-                    for j in range(i + 1, len(df)):
-                        # Kontrola výstupu podle ceny
-                        if trade.check_exit_conditions(df['high'].iloc[j], df['low'].iloc[j], df.index[j]):
-                            active_long = False
-                            break
-                        
-                        # Výstup podle RSI
-                        if df['exit_long_signal'].iloc[j]:
-                            trade.exit_price = df['close'].iloc[j]
-                            trade.exit_time = df.index[j]
-                            trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price > trade.entry_price else TradeStatus.CLOSED_LOSS
-                            trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
-                            trade.exit_reason = "RSI Exit"
-                            active_long = False
-                            break
+                    # Vektorizované hledání prvního výstupu: zásah SL/TP podle
+                    # ceny má v rámci jednoho baru přednost před RSI signálem
+                    price_idx, price_exit, price_reason = _scan_exit(
+                        highs, lows, i + 1, stop_loss, take_profit, True)
+                    pos = np.searchsorted(exit_long_positions, i + 1)
+                    rsi_idx = int(exit_long_positions[pos]) if pos < len(exit_long_positions) else -1
                     
-                    # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
-                    if trade.status == TradeStatus.OPEN:
-                        trade.exit_price = df['close'].iloc[-1]
-                        trade.exit_time = df.index[-1]
+                    if price_idx >= 0 and (rsi_idx < 0 or price_idx <= rsi_idx):
+                        # Výstup podle ceny
+                        trade.exit_price = price_exit
+                        trade.exit_time = times[price_idx]
+                        trade.status = (TradeStatus.CLOSED_LOSS if price_reason == "Stop-Loss"
+                                        else TradeStatus.CLOSED_PROFIT)
+                        trade.exit_reason = price_reason
+                    elif rsi_idx >= 0:
+                        # Výstup podle RSI
+                        trade.exit_price = closes[rsi_idx]
+                        trade.exit_time = times[rsi_idx]
+                        trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price > trade.entry_price else TradeStatus.CLOSED_LOSS
+                        trade.exit_reason = "RSI Exit"
+                    else:
+                        # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
+                        trade.exit_price = closes[-1]
+                        trade.exit_time = times[-1]
                         trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price > trade.entry_price else TradeStatus.CLOSED_LOSS
-                        trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
                         trade.exit_reason = "Konec backtestu"
-                        active_long = False
+                    
+                    trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
+                    active_long = False
                     
                     # Přidání obchodu do seznamu
                     self.trades.append(trade)
+                    running_eq += trade.profit_percentage
+                    peak_eq = max(peak_eq, running_eq)
+                    if early_stop_dd is not None and peak_eq - running_eq > early_stop_dd:
+                        self.pruned = True
+                        break
             
             # Sell signál
-            if df['sell_signal'].iloc[i] and (not active_short or not self.parameters["wait_for_exit_before_new_entry"]):
-                entry_price = df['close'].iloc[i]
-                entry_time = df.index[i]
-                
-                # Nastavení stop-loss
-                if self.parameters["use_atr_for_sl"]:
-                    stop_loss = entry_price + (df['atr'].iloc[i] * self.parameters["atr_multiplier"])
-                else:
-                    stop_loss = entry_price * (1 + self.parameters["stop_loss_pips"] / 100)
-                
-                # Nastavení take-profit úrovní
-                take_profit = [entry_price * (1 - tp_pips / 100) for tp_pips in self.parameters["take_profit_pips"]]
+            if sell_signals[i] and (not active_short or not wait_for_exit):
+                entry_price = closes[i]
+                entry_time = times[i]
+                stop_loss = sl_sell[i]
+                take_profit = tp_sell[i].tolist()
                 
                 # Kontrola minimálního poměru rizika k zisku
                 risk = stop_loss - entry_price
                 reward = entry_price - take_profit[0]
                 rr_ratio = reward / risk if risk > 0 else 0
                 
-                if rr_ratio >= self.parameters["risk_reward_ratio"]:
+                if rr_ratio >= min_rr_ratio:
                     active_short = True
                     
                     # Vytvoření obchodu
                     trade = Trade(
-                        symbol=df.get('symbol', ['Unknown'])[0] if isinstance(df.get('symbol'), pd.Series) else "Unknown",
+                        symbol=symbol,
                         trade_type=TradeType.SELL,
                         entry_price=entry_price,
                         entry_time=entry_time,
@@ -855,34 +1000,43 @@ class RSIStrategy(TradingStrategy):
                         status=TradeStatus.OPEN
                     )
                     
-                    # Simulace výsledku obchodu
-                    for j in range(i + 1, len(df)):
-                        # Kontrola výstupu podle ceny
-                        if trade.check_exit_conditions(df['high'].iloc[j], df['low'].iloc[j], df.index[j]):
-                            active_short = False
-                            break
-                        
-                        # Výstup podle RSI
-                        if df['exit_short_signal'].iloc[j]:
-                            trade.exit_price = df['close'].iloc[j]
-                            trade.exit_time = df.index[j]
-                            trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price < trade.entry_price else TradeStatus.CLOSED_LOSS
-                            trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
-                            trade.exit_reason = "RSI Exit"
-                            active_short = False
-                            break
+                    # Vektorizované hledání prvního výstupu: zásah SL/TP podle
+                    # ceny má v rámci jednoho baru přednost před RSI signálem
+                    price_idx, price_exit, price_reason = _scan_exit(
+                        highs, lows, i + 1, stop_loss, take_profit, False)
+                    pos = np.searchsorted(exit_short_positions, i + 1)
+                    rsi_idx = int(exit_short_positions[pos]) if pos < len(exit_short_positions) else -1
                     
-                    # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
-                    if trade.status == TradeStatus.OPEN:
-                        trade.exit_price = df['close'].iloc[-1]
-                        trade.exit_time = df.index[-1]
+                    if price_idx >= 0 and (rsi_idx < 0 or price_idx <= rsi_idx):
+                        # Výstup podle ceny
+                        trade.exit_price = price_exit
+                        trade.exit_time = times[price_idx]
+                        trade.status = (TradeStatus.CLOSED_LOSS if price_reason == "Stop-Loss"
+                                        else TradeStatus.CLOSED_PROFIT)
+                        trade.exit_reason = price_reason
+                    elif rsi_idx >= 0:
+                        # Výstup podle RSI
+                        trade.exit_price = closes[rsi_idx]
+                        trade.exit_time = times[rsi_idx]
+                        trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price < trade.entry_price else TradeStatus.CLOSED_LOSS
+                        trade.exit_reason = "RSI Exit"
+                    else:
+                        # Pokud obchod nebyl uzavřen, uzavřeme ho na poslední ceně
+                        trade.exit_price = closes[-1]
+                        trade.exit_time = times[-1]
                         trade.status = TradeStatus.CLOSED_PROFIT if trade.exit_price < trade.entry_price else TradeStatus.CLOSED_LOSS
-                        trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
                         trade.exit_reason = "Konec backtestu"
-                        active_short = False
+                    
+                    trade.profit_pips, trade.profit_percentage = trade.calculate_profit(trade.exit_price)
+                    active_short = False
                     
                     # Přidání obchodu do seznamu
                     self.trades.append(trade)
+                    running_eq += trade.profit_percentage
+                    peak_eq = max(peak_eq, running_eq)
+                    if early_stop_dd is not None and peak_eq - running_eq > early_stop_dd:
+                        self.pruned = True
+                        break
 
 
 def plot_strategy_comparison(results_list: List[Dict[str, Any]]) -> go.Figure:
@@ -898,12 +1052,14 @@ def plot_strategy_comparison(results_list: List[Dict[str, Any]]) -> go.Figure:
     if not results_list:
         return go.Figure()
     
-    # Extrakce názvů strategií a metrik
+    # Extrakce názvů strategií a metrik - jeden průchod přes výsledky,
+    # sloupce se pak berou vektorizovaně z pomocného DataFramu
     strategy_names = [result["strategy_name"] for result in results_list]
-    total_profits = [result["metrics"]["total_profit"] for result in results_list]
-    win_rates = [result["metrics"]["win_rate"] * 100 for result in results_list]
-    profit_factors = [result["metrics"]["profit_factor"] for result in results_list]
-    max_drawdowns = [result["metrics"]["max_drawdown"] for result in results_list]
+    metrics_df = pd.DataFrame.from_records([result["metrics"] for result in results_list])
+    total_profits = metrics_df["total_profit"].to_numpy()
+    win_rates = metrics_df["win_rate"].to_numpy() * 100
+    profit_factors = metrics_df["profit_factor"].to_numpy()
+    max_drawdowns = metrics_df["max_drawdown"].to_numpy()
     
     # Vytvoření grafu s více panely
     fig = make_subplots(
@@ -917,7 +1073,7 @@ def plot_strategy_comparison(results_list: List[Dict[str, Any]]) -> go.Figure:
         go.Bar(
             x=strategy_names,
             y=total_profits,
-            marker_color=['green' if profit >= 0 else 'red' for profit in total_profits],
+            marker_color=np.where(total_profits >= 0, 'green', 'red').tolist(),
             name="Celkový zisk (%)"
         ),
         row=1, col=1
@@ -939,7 +1095,7 @@ def plot_strategy_comparison(results_list: List[Dict[str, Any]]) -> go.Figure:
         go.Bar(
             x=strategy_names,
             y=profit_factors,
-            marker_color=['green' if pf >= 1 else 'red' for pf in profit_factors],
+            marker_color=np.where(profit_factors >= 1, 'green', 'red').tolist(),
             name="Profit Factor"
         ),
         row=2, col=1
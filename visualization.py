@@ -1,11 +1,191 @@
+import logging
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import streamlit as st
 from typing import Optional, Dict, Any, List
 
+logger = logging.getLogger(__name__)
+
+# Sdílená šablona grafů registrovaná jednou při importu - legenda a další
+# společné prvky layoutu se pak nevalidují při každém vykreslení
+pio.templates['trading_dash'] = go.layout.Template(
+    layout=dict(
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+)
+
+# CSS bloky panelů hoistnuté na úroveň modulu - funkce je jen posílají,
+# víckrát se neskládají
+_PRICE_CSS = """
+    <style>
+    .price-card {
+        background: linear-gradient(135deg, rgba(60, 8, 120, 0.7) 0%, rgba(100, 25, 180, 0.7) 100%);
+        border: 1px solid rgba(180, 155, 255, 0.3);
+        border-radius: 15px;
+        padding: 15px;
+        margin: 10px 0;
+        backdrop-filter: blur(5px);
+        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2), 0 0 20px rgba(108, 34, 223, 0.2);
+    }
+    .price-title {
+        color: rgba(220, 220, 255, 0.8);
+        font-size: 0.9em;
+        margin-bottom: 5px;
+        font-weight: 600;
+    }
+    .price-value {
+        color: white;
+        font-size: 1.6em;
+        font-weight: bold;
+        text-shadow: 0 0 10px rgba(255, 255, 255, 0.3);
+    }
+    .price-change-positive {
+        color: #4eff9f;
+        font-size: 1.1em;
+        font-weight: 600;
+    }
+    .price-change-negative {
+        color: #ff6b6b;
+        font-size: 1.1em;
+        font-weight: 600;
+    }
+    .price-range {
+        color: #b8abff;
+        font-size: 1.2em;
+        font-weight: 600;
+    }
+    </style>
+    """
+
+_DETAIL_CSS = """
+    <style>
+    .detail-card {
+        background: linear-gradient(135deg, rgba(35, 10, 60, 0.7) 0%, rgba(80, 20, 120, 0.7) 100%);
+        border: 1px solid rgba(160, 135, 255, 0.2);
+        border-radius: 12px;
+        padding: 15px;
+        margin: 10px 0;
+        backdrop-filter: blur(5px);
+        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+    }
+    .detail-header {
+        color: #a992ff;
+        font-size: 0.95em;
+        margin-bottom: 5px;
+        font-weight: 600;
+    }
+    .detail-value {
+        color: white;
+        font-size: 1.1em;
+        font-weight: 500;
+    }
+    .detail-expander {
+        background: linear-gradient(90deg, rgba(40, 10, 80, 0.5) 0%, rgba(80, 20, 160, 0.5) 100%);
+        border-radius: 10px;
+        padding: 5px 15px;
+        margin-top: 10px;
+        border: 1px solid rgba(160, 135, 255, 0.2);
+    }
+    </style>
+    """
+
+# Sloupce, bez kterých OHLC graf nedává smysl
+_REQUIRED_COLS = frozenset(('date', 'open', 'high', 'low', 'close'))
+
+# Čárové overlaye hlavního grafu: (sloupec, barva, popisek, styl čáry).
+# Deklarativní seznam místo čtyř kopií téhož Scatter bloku.
+_PRICE_OVERLAYS = [
+    ('sma_9', 'blue', 'SMA 9', None),
+    ('sma_20', 'orange', 'SMA 20', None),
+    ('sma_50', 'purple', 'SMA 50', None),
+    ('ema_20', 'green', 'EMA 20', 'dot'),
+]
+
+# Dvoubarevná škála pro sloupcové trasy: 0 = pokles (červená),
+# 1 = růst (zelená); barvy se pak posílají jako uint8 indexy
+_UP_DOWN_SCALE = [[0, 'red'], [1, 'green']]
+
+# Tituly a výšky subplotů pro každou kombinaci (objem, MACD, RSI)
+# předpočítané jednou - funkce jen sáhne do tabulky místo skládání seznamů
+_LAYOUTS = {
+    (v, m, r): (
+        ("Cena",)
+        + (("Objem",) if v else ())
+        + (("MACD",) if m else ())
+        + (("RSI",) if r else ()),
+        (0.7,) + (0.1,) * (v + m + r),
+    )
+    for v in (False, True) for m in (False, True) for r in (False, True)
+}
+
+
+def _downsample_ohlc(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Zredukuje dlouhou OHLC řadu na nejvýše max_points bodů agregací do košů.
+
+    Každý koš si ponechá první open, maximum high, minimum low a poslední
+    close (M4 agregace), objem se sčítá, datum se bere ze začátku koše a
+    indikátory z jeho konce - tvar grafu tak zůstává zachovaný.
+
+    Args:
+        df: DataFrame s historickými daty
+        max_points: Maximální počet bodů ve výsledku
+
+    Returns:
+        Agregovaný DataFrame (nebo původní, pokud je dost krátký)
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+    
+    buckets = (np.arange(n) * max_points) // n
+    aggregations = {}
+    for col in df.columns:
+        if col == 'open':
+            aggregations[col] = 'first'
+        elif col == 'high':
+            aggregations[col] = 'max'
+        elif col == 'low':
+            aggregations[col] = 'min'
+        elif col == 'volume':
+            aggregations[col] = 'sum'
+        elif col == 'date':
+            aggregations[col] = 'first'
+        else:
+            aggregations[col] = 'last'
+    return df.groupby(buckets).agg(aggregations).reset_index(drop=True)
+
+
+def _ohlc_fingerprint(df: pd.DataFrame) -> tuple:
+    """
+    Levný otisk DataFramu pro cache grafu.
+
+    Místo hashování celého obsahu stačí sloupce, délka, krajní datumy a
+    poslední zavírací cena - nová data z API některý z těchto údajů změní.
+    """
+    if df is None or df.empty:
+        return (0,)
+    first_date = str(df['date'].iloc[0]) if 'date' in df.columns else None
+    last_date = str(df['date'].iloc[-1]) if 'date' in df.columns else None
+    last_close = float(df['close'].iloc[-1]) if 'close' in df.columns else None
+    return (tuple(df.columns), len(df), first_date, last_date, last_close)
+
+
+@st.cache_data(show_spinner=False, max_entries=16,
+               hash_funcs={pd.DataFrame: _ohlc_fingerprint})
 def create_ohlc_chart(df: pd.DataFrame, title: str = "Vývoj ceny", show_volume: bool = True, 
-                      show_sma: bool = True, height: int = 700) -> Optional[go.Figure]:
+                      show_sma: bool = True, height: int = 700,
+                      max_points: int = 5000) -> Optional[go.Figure]:
     """
     Vytvoří OHLC (Open-High-Low-Close) graf ceny s pokročilými technickými indikátory.
     
@@ -15,311 +195,269 @@ def create_ohlc_chart(df: pd.DataFrame, title: str = "Vývoj ceny", show_volume:
         show_volume: Zobrazit objem obchodů
         show_sma: Zobrazit klouzavé průměry
         height: Výška grafu v pixelech
+        max_points: Maximální počet bodů na trasu; delší řady se agregují
         
     Returns:
         Plotly Figure objekt grafu nebo None v případě chyby
     """
-    try:
-        if df is None or df.empty or not all(col in df.columns for col in ['date', 'open', 'high', 'low', 'close']):
-            return None
-        
-        # Určení, kolik subplotů potřebujeme na základě dostupných dat
-        has_volume = show_volume and 'volume' in df.columns and not df['volume'].isna().all()
-        has_macd = 'macd' in df.columns and 'macd_signal' in df.columns
-        has_rsi = 'rsi_14' in df.columns
-        
-        # Počet subplot grafů a jejich výšky
-        num_rows = 1
-        row_heights = [0.7]
-        subplot_titles = ["Cena"]
-        
-        if has_volume:
-            num_rows += 1
-            row_heights.append(0.1)
-            subplot_titles.append("Objem")
-            
-        if has_macd:
-            num_rows += 1
-            row_heights.append(0.1)
-            subplot_titles.append("MACD")
-            
-        if has_rsi:
-            num_rows += 1
-            row_heights.append(0.1)
-            subplot_titles.append("RSI")
-        
-        # Vytvoření subplot grafů
-        fig = make_subplots(
-            rows=num_rows, 
-            cols=1, 
-            shared_xaxes=True, 
-            vertical_spacing=0.02,
-            row_heights=row_heights,
-            subplot_titles=subplot_titles
-        )
-        
-        # 1. HLAVNÍ SVÍČKOVÝ GRAF
-        fig.add_trace(
-            go.Candlestick(
-                x=df['date'],
-                open=df['open'],
-                high=df['high'],
-                low=df['low'],
-                close=df['close'],
-                name="OHLC",
-                increasing_line_color='green',
-                decreasing_line_color='red'
-            ),
-            row=1, col=1
-        )
-        
-        # Přidání klouzavých průměrů
-        if show_sma:
-            # Krátké SMA
-            if 'sma_9' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['sma_9'],
-                        mode='lines',
-                        line=dict(color='blue', width=1),
-                        name="SMA 9"
-                    ),
-                    row=1, col=1
-                )
-            
-            # Střednědobé SMA
-            if 'sma_20' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['sma_20'],
-                        mode='lines',
-                        line=dict(color='orange', width=1),
-                        name="SMA 20"
-                    ),
-                    row=1, col=1
-                )
-            
-            # Dlouhodobé SMA
-            if 'sma_50' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['sma_50'],
-                        mode='lines',
-                        line=dict(color='purple', width=1),
-                        name="SMA 50"
-                    ),
-                    row=1, col=1
-                )
-                
-            # EMA indikátory
-            if 'ema_20' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['ema_20'],
-                        mode='lines',
-                        line=dict(color='green', width=1, dash='dot'),
-                        name="EMA 20"
-                    ),
-                    row=1, col=1
-                )
-                
-            # Bollinger Bands
-            if 'bb_upper' in df.columns and 'bb_lower' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['bb_upper'],
-                        mode='lines',
-                        line=dict(color='rgba(250, 0, 0, 0.4)', width=1),
-                        name="BB Upper"
-                    ),
-                    row=1, col=1
-                )
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['bb_lower'],
+    if df is None or df.empty or not _REQUIRED_COLS.issubset(df.columns):
+        logger.debug("create_ohlc_chart: prázdná data nebo chybějící povinné sloupce")
+        return None
+    
+    # Dlouhé historie se před vykreslením zredukují - prohlížeč pak
+    # nedostává statisíce bodů, které stejně nelze rozlišit
+    df = _downsample_ohlc(df, max_points)
+    
+    # Jednorázová extrakce všech sloupců do slovníku NumPy polí (SoA) -
+    # Plotly je serializuje rychleji než pandas Series a zbytek funkce
+    # už na DataFrame nesahá
+    cols = {col: df[col].to_numpy() for col in df.columns}
+    # Pro vykreslení stačí float32 - poloviční objem dat pro prohlížeč
+    # při víc než dostatečné přesnosti (~7 platných číslic)
+    cols = {col: (arr.astype(np.float32, copy=False)
+                  if np.issubdtype(arr.dtype, np.floating) else arr)
+            for col, arr in cols.items()}
+    # Osa X musí být datetime64[ns] - typované pole projde serializací
+    # jako binární blok, kdežto object pole by Plotly formátovalo na
+    # ISO řetězce prvek po prvku
+    if cols['date'].dtype == object:
+        cols['date'] = pd.to_datetime(df['date']).to_numpy()
+    dates = cols['date']
+
+    # Trasy se sbírají do dávky a přidávají jediným add_traces na konci
+    traces = []
+    trace_rows = []
+    
+    def _queue(trace, row, col=1):
+        traces.append(trace)
+        trace_rows.append(row)
+    
+    # Vodorovné linky se sbírají jako slovníky a nastaví najednou
+    # v update_layout místo samostatných add_shape volání
+    shapes = []
+    
+    def _hline(y, color, row):
+        axis = '' if row == 1 else str(row)
+        shapes.append(dict(
+            type="line",
+            xref=f"x{axis}", yref=f"y{axis}",
+            x0=dates[0], x1=dates[-1],
+            y0=y, y1=y,
+            line=dict(color=color, width=1, dash="dash")
+        ))
+    
+    # Určení, kolik subplotů potřebujeme na základě dostupných dat
+    has_volume = show_volume and 'volume' in cols and df['volume'].notna().any()
+    has_macd = 'macd' in cols and 'macd_signal' in cols
+    has_rsi = 'rsi_14' in cols
+    
+    # Tituly a výšky subplotů z předpočítané tabulky; tabulka řádků row_of
+    # se dál sdílí mezi blokem tras a závěrečným nastavením os
+    subplot_titles, row_heights = _LAYOUTS[(has_volume, has_macd, has_rsi)]
+    num_rows = len(row_heights)
+
+    row_of = {'price': 1}
+    next_row = 1
+    for panel, present in (('volume', has_volume),
+                           ('macd', has_macd),
+                           ('rsi', has_rsi)):
+        if present:
+            next_row += 1
+            row_of[panel] = next_row
+    
+    # Vytvoření subplot grafů
+    fig = make_subplots(
+        rows=num_rows, 
+        cols=1, 
+        shared_xaxes=True, 
+        vertical_spacing=0.02,
+        row_heights=row_heights,
+        subplot_titles=subplot_titles
+    )
+    
+    # 1. HLAVNÍ SVÍČKOVÝ GRAF
+    _queue(
+        go.Candlestick(
+            x=dates,
+            open=cols['open'],
+            high=cols['high'],
+            low=cols['low'],
+            close=cols['close'],
+            name="OHLC",
+            increasing_line_color='green',
+            decreasing_line_color='red'
+        ),
+        row=1, col=1
+    )
+    
+    # Přidání klouzavých průměrů podle deklarativního seznamu
+    if show_sma:
+        for col_name, color, name, dash in _PRICE_OVERLAYS:
+            if col_name in cols:
+                _queue(
+                    go.Scattergl(
+                        x=dates,
+                        y=cols[col_name],
                         mode='lines',
-                        line=dict(color='rgba(250, 0, 0, 0.4)', width=1),
-                        name="BB Lower",
-                        fill='tonexty',
-                        fillcolor='rgba(200, 200, 200, 0.2)'
+                        line=dict(color=color, width=1, dash=dash),
+                        name=name,
+                        # Hodnoty v cenovém panelu už nese hover svíček,
+                        # hovertext overlayů by jen nafukoval payload
+                        hoverinfo='skip'
                     ),
                     row=1, col=1
                 )
-        
-        # Aktuální řádek pro další grafy
-        current_row = 1
-        
-        # 2. VOLUME
-        if has_volume:
-            current_row += 1
-            # Určení barvy sloupců podle pohybu ceny
-            colors = ['green' if row['close'] >= row['open'] else 'red' for _, row in df.iterrows()]
-            
-            fig.add_trace(
-                go.Bar(
-                    x=df['date'],
-                    y=df['volume'],
-                    name="Objem",
-                    marker_color=colors,
-                    opacity=0.7
+
+
+        # Bollinger Bands - jeden uzavřený polygon (horní pás dopředu,
+        # dolní pozpátku) místo dvou tras s fill='tonexty'
+        if 'bb_upper' in cols and 'bb_lower' in cols:
+            _queue(
+                go.Scattergl(
+                    x=np.concatenate([dates, dates[::-1]]),
+                    y=np.concatenate([cols['bb_upper'], cols['bb_lower'][::-1]]),
+                    mode='lines',
+                    line=dict(color='rgba(250, 0, 0, 0.4)', width=1),
+                    name="BB",
+                    fill='toself',
+                    fillcolor='rgba(200, 200, 200, 0.2)',
+                    hoverinfo='skip'
                 ),
-                row=current_row, col=1
+                row=1, col=1
             )
-            
-            # VWAP pokud je dostupný
-            if 'vwap' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['date'],
-                        y=df['vwap'],
-                        mode='lines',
-                        line=dict(color='blue', width=1.5),
-                        name="VWAP"
-                    ),
-                    row=1, col=1
-                )
+    
+    # 2. VOLUME
+    if has_volume:
+        # Barva sloupců podle pohybu ceny - místo pole řetězců se posílá
+        # uint8 index do dvoubarevné škály, bar na bajt místo pěti
+        is_up = (cols['close'] >= cols['open']).astype(np.uint8)
+
+        _queue(
+            go.Bar(
+                x=dates,
+                y=cols['volume'],
+                name="Objem",
+                marker=dict(color=is_up, colorscale=_UP_DOWN_SCALE,
+                            cmin=0, cmax=1),
+                opacity=0.7
+            ),
+            row=row_of['volume'], col=1
+        )
         
-        # 3. MACD (Moving Average Convergence Divergence)
-        if has_macd:
-            current_row += 1
-            fig.add_trace(
-                go.Scatter(
-                    x=df['date'],
-                    y=df['macd'],
+        # VWAP pokud je dostupný
+        if 'vwap' in cols:
+            _queue(
+                go.Scattergl(
+                    x=dates,
+                    y=cols['vwap'],
                     mode='lines',
                     line=dict(color='blue', width=1.5),
-                    name="MACD"
-                ),
-                row=current_row, col=1
-            )
-            
-            fig.add_trace(
-                go.Scatter(
-                    x=df['date'],
-                    y=df['macd_signal'],
-                    mode='lines',
-                    line=dict(color='red', width=1),
-                    name="Signal"
+                    name="VWAP",
+                    hoverinfo='skip'
                 ),
-                row=current_row, col=1
+                row=1, col=1
             )
-            
-            # MACD histogram
-            if 'macd_hist' in df.columns:
-                colors = ['green' if val >= 0 else 'red' for val in df['macd_hist']]
-                fig.add_trace(
-                    go.Bar(
-                        x=df['date'],
-                        y=df['macd_hist'],
-                        marker_color=colors,
-                        name="MACD Hist"
-                    ),
-                    row=current_row, col=1
-                )
-                
-                # Nulová linka pro MACD
-                fig.add_shape(
-                    type="line",
-                    x0=df['date'].iloc[0],
-                    x1=df['date'].iloc[-1],
-                    y0=0, y1=0,
-                    line=dict(color="gray", width=1, dash="dash"),
-                    row=current_row, col=1
-                )
+    
+    # 3. MACD (Moving Average Convergence Divergence)
+    if has_macd:
+        macd_row = row_of['macd']
+        _queue(
+            go.Scattergl(
+                x=dates,
+                y=cols['macd'],
+                mode='lines',
+                line=dict(color='blue', width=1.5),
+                name="MACD"
+            ),
+            row=macd_row, col=1
+        )
         
-        # 4. RSI (Relative Strength Index)
-        if has_rsi:
-            current_row += 1
-            fig.add_trace(
-                go.Scatter(
-                    x=df['date'],
-                    y=df['rsi_14'],
-                    mode='lines',
-                    line=dict(color='purple', width=1.5),
-                    name="RSI"
-                ),
-                row=current_row, col=1
-            )
-            
-            # Přidání vodítek pro překoupené/přeprodané oblasti (70/30)
-            fig.add_shape(
-                type="line",
-                x0=df['date'].iloc[0],
-                x1=df['date'].iloc[-1],
-                y0=70, y1=70,
-                line=dict(color="red", width=1, dash="dash"),
-                row=current_row, col=1
-            )
-            
-            fig.add_shape(
-                type="line",
-                x0=df['date'].iloc[0],
-                x1=df['date'].iloc[-1],
-                y0=30, y1=30,
-                line=dict(color="green", width=1, dash="dash"),
-                row=current_row, col=1
-            )
-            
-            # Přidání středové linky na 50
-            fig.add_shape(
-                type="line",
-                x0=df['date'].iloc[0],
-                x1=df['date'].iloc[-1],
-                y0=50, y1=50,
-                line=dict(color="gray", width=1, dash="dash"),
-                row=current_row, col=1
-            )
-            
-            # Nastavení rozsahu RSI grafu
-            fig.update_yaxes(range=[0, 100], row=current_row, col=1)
+        _queue(
+            go.Scattergl(
+                x=dates,
+                y=cols['macd_signal'],
+                mode='lines',
+                line=dict(color='red', width=1),
+                name="Signal"
+            ),
+            row=macd_row, col=1
+        )
         
-        # Formátování layoutu grafu
-        fig.update_layout(
-            title=title,
-            height=height,
-            xaxis_rangeslider_visible=False,  # Skryjeme rangeslider pro úsporu místa
-            template='plotly_white',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
+        # MACD histogram
+        if 'macd_hist' in cols:
+            hist_up = (cols['macd_hist'] >= 0).astype(np.uint8)
+            _queue(
+                go.Bar(
+                    x=dates,
+                    y=cols['macd_hist'],
+                    marker=dict(color=hist_up, colorscale=_UP_DOWN_SCALE,
+                                cmin=0, cmax=1),
+                    name="MACD Hist"
+                ),
+                row=macd_row, col=1
             )
+
+            # Nulová linka pro MACD
+            _hline(0, "gray", macd_row)
+    
+    # 4. RSI (Relative Strength Index)
+    if has_rsi:
+        rsi_row = row_of['rsi']
+        _queue(
+            go.Scattergl(
+                x=dates,
+                y=cols['rsi_14'],
+                mode='lines',
+                line=dict(color='purple', width=1.5),
+                name="RSI"
+            ),
+            row=rsi_row, col=1
         )
-        
-        # Nastavení os Y
-        fig.update_yaxes(title_text="Cena", row=1, col=1)
-        
-        if has_volume:
-            volume_row = 2
-            fig.update_yaxes(title_text="Objem", row=volume_row, col=1)
-            
-        if has_macd:
-            macd_row = 3 if has_volume else 2
-            fig.update_yaxes(title_text="MACD", row=macd_row, col=1)
-            
-        if has_rsi:
-            rsi_row = num_rows  # Poslední řádek
-            fig.update_yaxes(title_text="RSI", row=rsi_row, col=1)
-        
-        return fig
-        
-    except Exception as e:
-        print(f"Chyba při vytváření grafu: {e}")
-        return None
 
+        # Přidání vodítek pro překoupené/přeprodané oblasti (70/30)
+        # a středové linky na 50
+        _hline(70, "red", rsi_row)
+        _hline(30, "green", rsi_row)
+        _hline(50, "gray", rsi_row)
+
+        # Nastavení rozsahu RSI grafu
+        fig.update_yaxes(range=[0, 100], row=rsi_row, col=1)
+    
+    # Hromadné přidání všech tras jedním voláním
+    fig.add_traces(traces, rows=trace_rows, cols=[1] * len(traces))
+    
+    # Formátování layoutu grafu
+    fig.update_layout(
+        title=title,
+        height=height,
+        shapes=shapes,
+        xaxis_rangeslider_visible=False,  # Skryjeme rangeslider pro úsporu místa
+        template='plotly_white+trading_dash'
+    )
+    
+    # Nastavení os Y
+    fig.update_yaxes(title_text="Cena", row=1, col=1)
+    
+    if has_volume:
+        fig.update_yaxes(title_text="Objem", row=row_of['volume'], col=1)
+
+    if has_macd:
+        fig.update_yaxes(title_text="MACD", row=row_of['macd'], col=1)
+
+    if has_rsi:
+        fig.update_yaxes(title_text="RSI", row=row_of['rsi'], col=1)
+    
+    return fig
+    
+
+@st.fragment
 def display_price_indicators(quote_data: Dict[str, Any]):
     """
     Zobrazí indikátory ceny (aktuální cena, denní rozsah, změna) s futuristickým designem.
-    
+
+    Běží jako fragment - interakce jinde na stránce (např. přepínače grafu)
+    tenhle panel znovu nevykreslují.
+
     Args:
         quote_data: Slovník s formátovanými daty o kotaci
     """
@@ -328,46 +466,7 @@ def display_price_indicators(quote_data: Dict[str, Any]):
         return
     
     # Pokročilý styl pro zobrazení indikátorů
-    st.markdown("""
-    <style>
-    .price-card {
-        background: linear-gradient(135deg, rgba(60, 8, 120, 0.7) 0%, rgba(100, 25, 180, 0.7) 100%);
-        border: 1px solid rgba(180, 155, 255, 0.3);
-        border-radius: 15px;
-        padding: 15px;
-        margin: 10px 0;
-        backdrop-filter: blur(5px);
-        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2), 0 0 20px rgba(108, 34, 223, 0.2);
-    }
-    .price-title {
-        color: rgba(220, 220, 255, 0.8);
-        font-size: 0.9em;
-        margin-bottom: 5px;
-        font-weight: 600;
-    }
-    .price-value {
-        color: white;
-        font-size: 1.6em;
-        font-weight: bold;
-        text-shadow: 0 0 10px rgba(255, 255, 255, 0.3);
-    }
-    .price-change-positive {
-        color: #4eff9f;
-        font-size: 1.1em;
-        font-weight: 600;
-    }
-    .price-change-negative {
-        color: #ff6b6b;
-        font-size: 1.1em;
-        font-weight: 600;
-    }
-    .price-range {
-        color: #b8abff;
-        font-size: 1.2em;
-        font-weight: 600;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_PRICE_CSS, unsafe_allow_html=True)
     
     # Vytvoření 3 sloupců pro zobrazení indikátorů
     col1, col2, col3 = st.columns(3)
@@ -422,99 +521,80 @@ def display_price_indicators(quote_data: Dict[str, Any]):
             </div>
             """, unsafe_allow_html=True)
 
+@st.fragment
 def display_quote_details(quote_data: Dict[str, Any]):
     """
     Zobrazí detailní informace o kotaci s futuristickým designem.
-    
+
+    Běží jako fragment ze stejného důvodu jako display_price_indicators.
+
     Args:
         quote_data: Slovník s daty o kotaci
     """
     if not quote_data:
         return
-    
+
+    # Opakovaně používané hodnoty se ze slovníku vytáhnou jen jednou
+    currency = quote_data.get('currency', '')
+    fifty_two_week = quote_data.get('fifty_two_week') or {}
+
     # Styl pro detail karty
-    st.markdown("""
-    <style>
-    .detail-card {
-        background: linear-gradient(135deg, rgba(35, 10, 60, 0.7) 0%, rgba(80, 20, 120, 0.7) 100%);
-        border: 1px solid rgba(160, 135, 255, 0.2);
-        border-radius: 12px;
-        padding: 15px;
-        margin: 10px 0;
-        backdrop-filter: blur(5px);
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-    }
-    .detail-header {
-        color: #a992ff;
-        font-size: 0.95em;
-        margin-bottom: 5px;
-        font-weight: 600;
-    }
-    .detail-value {
-        color: white;
-        font-size: 1.1em;
-        font-weight: 500;
-    }
-    .detail-expander {
-        background: linear-gradient(90deg, rgba(40, 10, 80, 0.5) 0%, rgba(80, 20, 160, 0.5) 100%);
-        border-radius: 10px;
-        padding: 5px 15px;
-        margin-top: 10px;
-        border: 1px solid rgba(160, 135, 255, 0.2);
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_DETAIL_CSS, unsafe_allow_html=True)
     
-    # Vytvoříme expandující sekci s detaily
+    # Vytvoříme expandující sekci s detaily - HTML každého sloupce se
+    # poskládá do jednoho řetězce a pošle jediným st.markdown, místo
+    # samostatného volání (a zprávy ve frontě delt) pro každý řádek
     with st.expander("📊 Detailní informace", expanded=False):
         # Základní informace
         col1, col2, col3 = st.columns(3)
-        
+
         with col1:
-            st.markdown('<div class="detail-card">', unsafe_allow_html=True)
-            
+            parts = ['<div class="detail-card">']
+
             if 'name' in quote_data:
-                st.markdown(f'<div class="detail-header">NÁZEV</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("name", "")}</div>', unsafe_allow_html=True)
-            
+                parts.append(f'<div class="detail-header">NÁZEV</div>'
+                             f'<div class="detail-value">{quote_data.get("name", "")}</div>')
+
             if 'symbol' in quote_data:
-                st.markdown(f'<div class="detail-header">SYMBOL</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("symbol", "")}</div>', unsafe_allow_html=True)
-            
+                parts.append(f'<div class="detail-header">SYMBOL</div>'
+                             f'<div class="detail-value">{quote_data.get("symbol", "")}</div>')
+
             if 'exchange' in quote_data:
-                st.markdown(f'<div class="detail-header">BURZA</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("exchange", "")}</div>', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+                parts.append(f'<div class="detail-header">BURZA</div>'
+                             f'<div class="detail-value">{quote_data.get("exchange", "")}</div>')
+
+            parts.append('</div>')
+            st.markdown(''.join(parts), unsafe_allow_html=True)
 
         with col2:
-            st.markdown('<div class="detail-card">', unsafe_allow_html=True)
-            
+            parts = ['<div class="detail-card">']
+
             if 'open' in quote_data:
-                st.markdown(f'<div class="detail-header">OTEVÍRACÍ CENA</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("open", "")} {quote_data.get("currency", "")}</div>', unsafe_allow_html=True)
-            
+                parts.append(f'<div class="detail-header">OTEVÍRACÍ CENA</div>'
+                             f'<div class="detail-value">{quote_data.get("open", "")} {currency}</div>')
+
             if 'previous_close' in quote_data:
-                st.markdown(f'<div class="detail-header">PŘEDCHOZÍ ZÁVĚR</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("previous_close", "")} {quote_data.get("currency", "")}</div>', unsafe_allow_html=True)
-            
+                parts.append(f'<div class="detail-header">PŘEDCHOZÍ ZÁVĚR</div>'
+                             f'<div class="detail-value">{quote_data.get("previous_close", "")} {currency}</div>')
+
             if 'datetime' in quote_data:
-                st.markdown(f'<div class="detail-header">DATUM A ČAS</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("datetime", "")}</div>', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+                parts.append(f'<div class="detail-header">DATUM A ČAS</div>'
+                             f'<div class="detail-value">{quote_data.get("datetime", "")}</div>')
+
+            parts.append('</div>')
+            st.markdown(''.join(parts), unsafe_allow_html=True)
 
         with col3:
-            st.markdown('<div class="detail-card">', unsafe_allow_html=True)
-            
+            parts = ['<div class="detail-card">']
+
             if 'fifty_two_week' in quote_data:
-                st.markdown(f'<div class="detail-header">52 TÝDENNÍ MINIMUM</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("fifty_two_week", {}).get("low", "")} {quote_data.get("currency", "")}</div>', unsafe_allow_html=True)
-                
-                st.markdown(f'<div class="detail-header">52 TÝDENNÍ MAXIMUM</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="detail-value">{quote_data.get("fifty_two_week", {}).get("high", "")} {quote_data.get("currency", "")}</div>', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+                parts.append(f'<div class="detail-header">52 TÝDENNÍ MINIMUM</div>'
+                             f'<div class="detail-value">{fifty_two_week.get("low", "")} {currency}</div>'
+                             f'<div class="detail-header">52 TÝDENNÍ MAXIMUM</div>'
+                             f'<div class="detail-value">{fifty_two_week.get("high", "")} {currency}</div>')
+
+            parts.append('</div>')
+            st.markdown(''.join(parts), unsafe_allow_html=True)
 
 def display_market_status(market_status: str):
     """
@@ -569,10 +649,8 @@ def display_loading_message():
     """Zobrazí zprávu o načítání."""
     return st.info("Načítám data, prosím čekejte...")
 
-def display_instructions():
-    """Zobrazí instrukce pro použití aplikace."""
-    with st.expander("Nápověda", expanded=False):
-        st.markdown("""
+# Text nápovědy jako modulová konstanta - funkce ho jen předá Streamlitu
+_INSTRUCTIONS_MD = """
         ### Jak používat aplikaci
 
         1. **Výběr kategorie a nástroje**
@@ -595,10 +673,16 @@ def display_instructions():
            - Pro funkčnost AI asistenta je potřeba API klíč od Google Gemini
            - Gemini API klíč je potřeba nastavit jako proměnnou prostředí s názvem `GEMINI_API_KEY`
            - Google Gemini API klíč můžete získat na [ai.google.dev](https://ai.google.dev/)
-           
+
         5. **Nastavení API klíčů**
            - Pro funkční aplikaci je nutný API klíč od Twelve Data
            - Klíč je potřeba nastavit jako proměnnou prostředí s názvem `TWELVE_DATA_API_KEY`
            - Twelve Data API klíč můžete získat na [twelvedata.com](https://twelvedata.com/)
            - Pro funkčnost AI asistenta je potřeba nastavit Gemini API klíč jako proměnnou prostředí s názvem `GEMINI_API_KEY`
-        """)
+        """
+
+
+def display_instructions():
+    """Zobrazí instrukce pro použití aplikace."""
+    with st.expander("Nápověda", expanded=False):
+        st.markdown(_INSTRUCTIONS_MD)